@@ -1,15 +1,47 @@
-from clockify_client import ClockifyClient
-import os
+from config import ConfigError, build_clockify_client, load_clockify_settings
+from project_catalog import OUTPUT_FORMATS, ProjectCatalog, format_projects
+import argparse
 from dotenv import load_dotenv
 
-load_dotenv()
 
-clockify = ClockifyClient(
-    api_key=os.getenv("CLOCKIFY_API_KEY"),
-    workspace_id=os.getenv("CLOCKIFY_WORKSPACE_ID")
-)
+def parse_args():
+    parser = argparse.ArgumentParser(description="List and search the projects of the Clockify workspace.")
+    parser.add_argument("query", nargs="?", default="",
+                        help="Show only projects whose name or client starts with this (case-insensitive)")
+    parser.add_argument("--client", action="store_true", help="Match the query against client names only")
+    parser.add_argument("--name", action="store_true", help="Match the query against project names only")
+    parser.add_argument("--contains", action="store_true", help="Match anywhere in the name or client, not just the start")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="Match the query's characters in order, best matches first (e.g. 'acmweb')")
+    parser.add_argument("--archived", action="store_true", help="Include archived projects")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="table", help="Output format (default: table)")
+    parser.add_argument("--refresh", action="store_true", help="Re-download projects instead of using the cache")
+    return parser.parse_args()
 
-# Use the method on ClockifyClient to print all projects
-clockify.list_all_projects()
-# This script lists all projects in the Clockify workspace.
-# It initializes the Clockify client with the API key and workspace ID from environment variables,
\ No newline at end of file
+
+def main():
+    args = parse_args()
+    load_dotenv()
+
+    try:
+        config = load_clockify_settings()
+    except ConfigError as e:
+        print(e)
+        return
+    # Built from the same settings as main.py, so it shares its metadata cache and endpoint
+    clockify = build_clockify_client(config, config["CLOCKIFY_API_KEY"], config["CLOCKIFY_WORKSPACE_ID"], concurrency=1)
+    if args.refresh:
+        clockify.metadata.refresh(clockify)
+
+    fields = ("client",) if args.client else ("name",) if args.name else ("name", "client")
+    mode = "fuzzy" if args.fuzzy else "substring" if args.contains else "prefix"
+    catalog = ProjectCatalog(clockify.metadata.projects(clockify, include_archived=True))
+    print(format_projects(catalog.search(args.query, fields, mode, include_archived=args.archived), args.format))
+
+
+if __name__ == "__main__":
+    main()
+
+# This script lists the projects in the Clockify workspace, e.g. to find the
+# exact names to use in rules.yaml. It reads the CLOCKIFY_* settings from the
+# environment and serves the listing from the shared metadata cache.
@@ -0,0 +1,55 @@
+import contextlib
+import json
+import os
+import tempfile
+
+
+def atomic_write(path, content):
+    """
+    Replace the file at path with content (a string). It is written to a
+    uniquely named temporary file in the same directory and moved into place,
+    so a crash never leaves a half-written file, readers see either the old
+    or the new version, and concurrent writers don't clobber each other's
+    temporary files. Missing parent directories are created.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile("w", dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp",
+                                      delete=False)
+    try:
+        with tmp:
+            tmp.write(content)
+        os.replace(tmp.name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp.name)
+        raise
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    atomic_write(path, json.dumps(data, **dump_kwargs))
+
+
+def read_json(path):
+    """
+    The JSON object stored at path. Raises OSError if it can't be read and
+    ValueError if it isn't valid JSON or holds something other than an object.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, found {type(data).__name__}")
+    return data
+
+
+def read_json_cache(path):
+    """
+    The JSON object at path, or None when there is no path, no file or the
+    file isn't a readable JSON object, so the caller rebuilds the cache.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return read_json(path)
+    except (OSError, ValueError):
+        return None
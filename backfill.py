@@ -0,0 +1,85 @@
+import os
+from datetime import date, datetime, timedelta, timezone
+from atomic_file import atomic_write_json, read_json
+from processing import sync_range
+from run_log import SUMMARY, log
+from write_pipeline import WritePipeline
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def load_checkpoint(path, start_date, end_date):
+    """
+    Return the last day completed by a previous backfill of the same range,
+    or None if there is nothing to resume.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        data = read_json(path)
+    except (OSError, ValueError) as e:
+        raise CheckpointError(f"[ERROR] Failed to read checkpoint {path}: {e}")
+    if data.get("start") != start_date.date().isoformat() or data.get("end") != end_date.date().isoformat():
+        raise CheckpointError(
+            f"[ERROR] Checkpoint {path} is for {data.get('start')} to {data.get('end')}, "
+            f"not {start_date.date()} to {end_date.date()}."
+        )
+    return date.fromisoformat(data["last_completed"])
+
+
+def save_checkpoint(path, start_date, end_date, last_completed):
+    data = {
+        "start": start_date.date().isoformat(),
+        "end": end_date.date().isoformat(),
+        "last_completed": last_completed.isoformat()
+    }
+    atomic_write_json(path, data)
+
+
+def run_backfill(calendar, clockify, config, args, start_date, end_date):
+    """
+    Sync a range of any length in windows of args.window_days. Each window is
+    fetched, processed and fully written before the next one starts, so memory
+    stays bounded. The checkpoint is updated after every committed window.
+    A window with failed writes stops the backfill without advancing the
+    checkpoint, so --resume retries it (duplicates are skipped).
+    """
+    window_start = start_date
+    if args.resume:
+        last_completed = load_checkpoint(args.checkpoint, start_date, end_date)
+        if last_completed is not None:
+            window_start = datetime(last_completed.year, last_completed.month, last_completed.day,
+                                    tzinfo=timezone.utc) + timedelta(days=1)
+            log.info("Resuming backfill after %s", last_completed)
+    if window_start > end_date:
+        log.info("Backfill already complete according to the checkpoint.", extra=SUMMARY)
+        return
+
+    succeeded = failed = 0
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=args.window_days - 1), end_date)
+        log.info("Backfilling window %s to %s", window_start.date(), window_end.date(), extra=SUMMARY)
+        writer = WritePipeline(args.concurrency)
+        try:
+            sync_range(calendar, clockify, config, args, window_start, window_end, writer)
+        finally:
+            writer.close()
+        succeeded += len(writer.succeeded)
+        failed += len(writer.failed)
+        for label, error in writer.failed:
+            log.error("%s failed: %s", label, error)
+        if writer.failed:
+            log.error("Window %s to %s had failed writes; stopping. Re-run with --resume to retry it.",
+                      window_start.date(), window_end.date())
+            break
+        if not args.simulate:
+            save_checkpoint(args.checkpoint, start_date, end_date, window_end.date())
+        window_start = window_end + timedelta(days=1)
+    else:
+        if not args.simulate and os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+        log.info("Backfill complete: %s to %s", start_date.date(), end_date.date(), extra=SUMMARY)
+
+    log.info("Writes: %d succeeded, %d failed", succeeded, failed, extra=SUMMARY)
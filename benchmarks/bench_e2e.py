@@ -0,0 +1,297 @@
+"""
+End-to-end benchmark: runs main() against local fake Clockify and Google
+Calendar servers (benchmarks/fake_servers.py) filled with a synthetic
+calendar, so performance changes can be measured without real accounts.
+
+Every scenario starts from fresh servers and an empty metadata cache, and
+reports the requests each server received, wall-clock time and events/s.
+
+    python benchmarks/bench_e2e.py                              # all scenarios
+    python benchmarks/bench_e2e.py --scenarios day-10 week-500  # a subset
+    python benchmarks/bench_e2e.py --latency-ms 50 --throttle-rate 0.05
+    python benchmarks/bench_e2e.py --save before.json
+    python benchmarks/bench_e2e.py --compare before.json        # after a change
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main as app  # noqa: E402
+from event_record import INTERNAL_DOMAIN  # noqa: E402
+from fake_servers import FakeCalendar, FakeClockify  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from processing import TAG_CALENDAR_BOT  # noqa: E402
+
+WORKSPACE_ID = "5f00000000000000000000aa"
+CALENDAR_ID = "bench@example.com"
+SELF_EMAIL = f"me@{INTERNAL_DOMAIN}"  # Internal, so its own meetings pick projects by attendee domain
+START = date(2025, 7, 1)
+
+# name: (days, events, extra command-line flags, calendars)
+SCENARIOS = {
+    "day-10": (1, 10, [], 1),
+    "week-500": (7, 500, [], 1),
+    "week-500-3-calendars": (7, 500, [], 3),
+    "month-1000": (31, 1000, [], 1),
+    "month-5000": (31, 5000, [], 1),
+    "month-5000-simulate": (31, 5000, ["--simulate"], 1),
+    "month-5000-purge": (31, 5000, ["--purge"], 1),
+}
+
+
+def make_rules(domain_count):
+    return {f"client{i}.com": f"Client {i}" for i in range(domain_count)}
+
+
+def make_events(days, count, domain_count, seed=0):
+    """
+    A synthetic calendar of count events spread evenly over days. Most are
+    accepted meetings with one client attendee; the rest exercise the skip
+    paths (all-day, no invitees, unknown domain, declined).
+    """
+    rng = random.Random(seed)
+    per_day = max(1, -(-count // days))
+    slot = max(1, min(30, (16 * 60) // per_day))  # Minutes, so a day's events never overlap
+    events = []
+    for i in range(count):
+        day = START + timedelta(days=i // per_day)
+        begins = datetime(day.year, day.month, day.day, 6, tzinfo=timezone.utc) + timedelta(minutes=slot * (i % per_day))
+        event = {
+            "id": f"evt{i:06d}",
+            "iCalUID": f"evt{i:06d}@bench",
+            "summary": f"Meeting {i}",
+            "description": "Agenda: status update",
+            "organizer": {"email": SELF_EMAIL},
+            "start": {"dateTime": begins.strftime("%Y-%m-%dT%H:%M:%SZ")},
+            "end": {"dateTime": (begins + timedelta(minutes=slot)).strftime("%Y-%m-%dT%H:%M:%SZ")},
+            "attendees": [
+                {"email": SELF_EMAIL, "responseStatus": "accepted"},
+                {"email": f"user{i}@client{rng.randrange(domain_count)}.com", "responseStatus": "accepted"}
+            ]
+        }
+        kind = rng.random()
+        if kind < 0.03:
+            event["start"] = {"date": day.isoformat()}
+            event["end"] = {"date": (day + timedelta(days=1)).isoformat()}
+        elif kind < 0.08:
+            del event["attendees"]
+        elif kind < 0.15:
+            event["attendees"][1]["email"] = f"user{i}@unknown{rng.randrange(1000)}.org"
+        elif kind < 0.18:
+            event["organizer"] = {"email": f"boss{i}@client0.com"}
+            event["attendees"][0]["responseStatus"] = "declined"
+        events.append(event)
+    return events
+
+
+def split_calendars(events, count):
+    """
+    Deal events round-robin over count calendars, the first being
+    CALENDAR_ID. Every tenth event also appears on the next calendar, under
+    its own ID but the same iCalUID, as a shared meeting would.
+    """
+    calendar_ids = [CALENDAR_ID] + [f"project{n}@example.com" for n in range(1, count)]
+    calendars = {calendar_id: [] for calendar_id in calendar_ids}
+    for i, event in enumerate(events):
+        calendars[calendar_ids[i % count]].append(event)
+        if count > 1 and i % 10 == 0:
+            calendars[calendar_ids[(i + 1) % count]].append(dict(event, id=f"{event['id']}-copy"))
+    return calendars
+
+
+def write_workdir(path, rules):
+    """rules.yaml and ignored_attendees.yaml for main() to load from the working directory."""
+    import yaml
+
+    with open(os.path.join(path, "rules.yaml"), "w") as f:
+        yaml.safe_dump(rules, f)
+    with open(os.path.join(path, "ignored_attendees.yaml"), "w") as f:
+        yaml.safe_dump({"self_email": SELF_EMAIL, "ignored_emails": []}, f)
+
+
+def seed_clockify(clockify, rules, events, purge):
+    for project in sorted(set(rules.values())):
+        clockify.add_project(project)
+    tag = clockify.add_tag(TAG_CALENDAR_BOT)
+    if purge:
+        # One bot entry per timed event, for the purge to delete
+        for event in events:
+            if "dateTime" in event["start"]:
+                clockify.add_entry(event["start"]["dateTime"], event["end"]["dateTime"],
+                                   event["summary"], tag_ids=[tag["id"]])
+
+
+@contextlib.contextmanager
+def environment(env, cwd, argv):
+    saved_env = {k: os.environ.get(k) for k in env}
+    saved_cwd, saved_argv = os.getcwd(), sys.argv
+    os.environ.update(env)
+    os.chdir(cwd)
+    sys.argv = argv
+    try:
+        yield
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        os.chdir(saved_cwd)
+        sys.argv = saved_argv
+
+
+def run_scenario(name, args):
+    days, count, flags, calendar_count = SCENARIOS[name]
+    rules = make_rules(args.domains)
+    events = make_events(days, count, args.domains, seed=args.seed)
+    end = START + timedelta(days=days - 1)
+
+    with tempfile.TemporaryDirectory() as workdir, \
+            FakeClockify(WORKSPACE_ID, latency=args.latency_ms / 1000, throttle_rate=args.throttle_rate,
+                         retry_after=args.retry_after, seed=args.seed) as clockify, \
+            FakeCalendar(latency=args.latency_ms / 1000, page_size=args.calendar_page_size) as calendar:
+        write_workdir(workdir, rules)
+        seed_clockify(clockify, rules, events, "--purge" in flags)
+        calendars = split_calendars(events, calendar_count)
+        for calendar_id, calendar_events in calendars.items():
+            calendar.set_events(calendar_id, calendar_events)
+        ids_before = set(clockify.entries)
+        entries_before = len(ids_before)
+
+        env = {
+            # Empty values keep a developer's .env from pointing main() at real accounts
+            "GOOGLE_CREDENTIALS_FILE": "",
+            "GOOGLE_CALENDAR_ID": ",".join(calendars),
+            "GOOGLE_CALENDAR_API_URL": calendar.api_url,
+            "CLOCKIFY_API_KEY": "bench-key",
+            "CLOCKIFY_WORKSPACE_ID": WORKSPACE_ID,
+            "CLOCKIFY_API_URL": clockify.api_url,
+            "CLOCKIFY_RATE_LIMIT": str(args.rate_limit),
+            "CLOCKIFY_POOL_SIZE": str(max(10, args.concurrency)),
+            "CLOCKIFY_CACHE_DIR": os.path.join(workdir, "cache"),
+        }
+        argv = ["main.py", "--start", START.isoformat(), "--end", end.isoformat(),
+                "--concurrency", str(args.concurrency)] + flags
+        METRICS.reset()
+        output = io.StringIO()
+        with environment(env, workdir, argv), contextlib.redirect_stdout(output):
+            started = time.perf_counter()
+            app.main()
+            elapsed = time.perf_counter() - started
+
+        errors = [line for line in output.getvalue().splitlines() if line.startswith("[ERROR]")]
+        metrics = METRICS.to_dict()
+        events_seen = sum(c["value"] for c in metrics["counters"] if c["name"] == "events_seen")
+        created = max(len(clockify.entries) - entries_before, 0)
+        deleted = max(entries_before - len(clockify.entries), 0)
+        with_project = sum(1 for entry_id, entry in clockify.entries.items()
+                           if entry_id not in ids_before and entry.get("projectId"))
+        # A run that reads or writes nothing measures nothing: fail it rather than report its timings
+        if "--purge" in flags:
+            if not deleted:
+                errors.append("[BENCH] The purge deleted no entries")
+        else:
+            if not events_seen:
+                errors.append("[BENCH] The sync saw no calendar events")
+            elif events_seen != count:
+                # Events shared between calendars must be processed once
+                errors.append(f"[BENCH] The sync saw {events_seen} events, expected {count}")
+            if not created and "--simulate" not in flags:
+                errors.append("[BENCH] The sync created no entries")
+            elif created and not with_project:
+                # Rule matching and project lookups never ran
+                errors.append("[BENCH] No created entry has a project")
+        if args.verbose:
+            print(output.getvalue())
+        return {
+            "days": days,
+            "events": count,
+            "flags": flags,
+            "wall_seconds": round(elapsed, 4),
+            "events_per_second": round(count / elapsed, 1) if elapsed else None,
+            "clockify_requests": clockify.total_requests(),
+            "clockify_throttled": clockify.throttled,
+            "calendar_requests": calendar.total_requests(),
+            "events_seen": events_seen,
+            "entries_created": created,
+            "entries_deleted": deleted,
+            "requests_by_route": {**{f"clockify {k}": v for k, v in sorted(clockify.requests.items())},
+                                  **{f"calendar {k}": v for k, v in sorted(calendar.requests.items())}},
+            "phases": metrics["phases"],
+            "errors": errors
+        }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"{'Scenario':22} | {'Events':>6} | {'Wall s':>8} | {'Events/s':>9} | {'Clockify':>8} | "
+          f"{'429':>4} | {'Calendar':>8} | {'Created':>7} | {'Deleted':>7}")
+    print("-" * 107)
+    for name, r in results.items():
+        print(f"{name:22} | {r['events']:6} | {r['wall_seconds']:8.2f} | {r['events_per_second'] or 0:9.0f} | "
+              f"{r['clockify_requests']:8} | {r['clockify_throttled']:4} | {r['calendar_requests']:8} | "
+              f"{r['entries_created']:7} | {r['entries_deleted']:7}")
+        for error in r["errors"]:
+            print(f"  {error}")
+    if baseline:
+        print(f"\nCompared with {baseline.get('revision') or 'baseline'}:")
+        for name, r in results.items():
+            before = baseline["scenarios"].get(name)
+            if not before:
+                continue
+            change = (r["wall_seconds"] - before["wall_seconds"]) / before["wall_seconds"] * 100
+            print(f"  {name:22} wall {before['wall_seconds']:.2f}s -> {r['wall_seconds']:.2f}s ({change:+.1f}%), "
+                  f"Clockify requests {before['clockify_requests']} -> {r['clockify_requests']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added to every fake server response")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Share of Clockify requests answered with 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--calendar-page-size", type=int, default=2500, help="Largest events.list page the fake returns")
+    parser.add_argument("--rate-limit", type=float, default=1000,
+                        help="Client-side Clockify requests/s (the real API allows 50)")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--domains", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Show main()'s output")
+    parser.add_argument("--save", help="Write the results as JSON to this path")
+    parser.add_argument("--compare", help="JSON file from an earlier --save to compare against")
+    args = parser.parse_args()
+
+    results = {name: run_scenario(name, args) for name in args.scenarios}
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.save:
+        settings = {k: v for k, v in vars(args).items() if k not in ("save", "compare", "verbose", "scenarios")}
+        with open(args.save, "w") as f:
+            json.dump({"revision": git_revision(), "settings": settings, "scenarios": results}, f, indent=2)
+    sys.exit(1 if any(r["errors"] for r in results.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
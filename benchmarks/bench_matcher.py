@@ -0,0 +1,77 @@
+"""
+Microbenchmark for the compiled rule engine in matcher.py.
+
+Generates synthetic calendar events and reports how many events per second
+RuleEngine.match_many can classify, plus the one-off compile cost.
+
+    python benchmarks/bench_matcher.py --events 50000 --domains 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import RuleEngine  # noqa: E402
+
+
+def make_rules(domain_count, keyword_count, pattern_count):
+    rules = {f"client{i}.com": f"Client {i}" for i in range(domain_count)}
+    rules["keywords"] = {f"topic{i}": f"Topic {i}" for i in range(keyword_count)}
+    rules["patterns"] = {rf"^TICKET{i}-\d+": f"Ticket {i}" for i in range(pattern_count)}
+    return rules
+
+
+def make_events(count, domain_count, keyword_count, seed=0):
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        attendees = [{"email": "me@wechange.company"}]
+        kind = rng.random()
+        if kind < 0.4:
+            # Subdomain of a known client, exercising suffix matching
+            attendees.append({"email": f"user{i}@eu.client{rng.randrange(domain_count)}.com"})
+        elif kind < 0.6:
+            attendees.append({"email": f"user{i}@unknown{rng.randrange(10000)}.org"})
+        summary = f"Meeting {i}"
+        if rng.random() < 0.3:
+            summary += f" about topic{rng.randrange(keyword_count)}"
+        description = "#proj Explicit" if rng.random() < 0.05 else "Agenda: status update and next steps"
+        events.append({"summary": summary, "description": description, "attendees": attendees})
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--domains", type=int, default=500)
+    parser.add_argument("--keywords", type=int, default=200)
+    parser.add_argument("--patterns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rules = make_rules(args.domains, args.keywords, args.patterns)
+    events = make_events(args.events, args.domains, args.keywords)
+
+    started = time.perf_counter()
+    engine = RuleEngine(rules)
+    compile_time = time.perf_counter() - started
+
+    best = None
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        results = engine.match_many(events)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    matched = sum(1 for r in results if r)
+    print(f"Compiled {args.domains} domains, {args.keywords} keywords, {args.patterns} patterns "
+          f"in {compile_time * 1000:.1f} ms")
+    print(f"Matched {matched}/{len(events)} events in {best * 1000:.1f} ms "
+          f"({len(events) / best:,.0f} events/s, best of {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Startup benchmark: measures how long `import main` takes using the
+interpreter's -X importtime output, and checks that headless runs don't pull
+in the GUI or Google client modules.
+
+    python benchmarks/bench_startup.py                 # report
+    python benchmarks/bench_startup.py --budget-ms 250 # fail if slower
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules that must only be imported on the code paths that need them
+LAZY_MODULES = ("tkinter", "tkcalendar", "ui_dialog", "googleapiclient", "google.oauth2")
+
+
+def measure(module):
+    """
+    Import module in a fresh interpreter with -X importtime.
+    Returns {imported module: (self_us, cumulative_us)}.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, help="Exit non-zero if the median import time exceeds this")
+    parser.add_argument("--save", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals = sorted(run[args.module][1] / 1000 for run in runs)
+    median_ms = totals[len(totals) // 2]
+    last = runs[-1]
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {totals[0]:.1f}, max {totals[-1]:.1f})")
+    print("\nSlowest modules by cumulative time (last run):")
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda i: -i[1][1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    eager = sorted(
+        name for name in last
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    )
+    failed = False
+    if eager:
+        print(f"\n[ERROR] Modules that should load lazily were imported: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"\n[ERROR] Median import time {median_ms:.1f} ms exceeds the {args.budget_ms:.1f} ms budget")
+        failed = True
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"module": args.module, "median_ms": median_ms, "runs_ms": totals,
+                       "eager_lazy_modules": eager}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
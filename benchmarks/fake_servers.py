@@ -0,0 +1,360 @@
+"""
+Local HTTP stand-ins for the Clockify v1 endpoints ClockifyClient uses and
+the Google Calendar events.list endpoint (plain and batched), for benchmarks that must not touch
+the real APIs. Both keep their data in memory, count every request and can
+add latency; the Clockify server can also answer a share of requests with 429.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+CLOCKIFY_MAX_PAGE_SIZE = 5000  # Largest page-size Clockify honors
+USER_ID = "5f0000000000000000000001"
+
+
+def object_id(n):
+    """24-hex ID shaped like Clockify's, so endpoint labels collapse them."""
+    return f"{n:024x}"
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+# A request or response body that isn't JSON, e.g. a multipart batch
+RawBody = namedtuple("RawBody", "content_type data")
+
+
+class FakeServer:
+    """
+    Base class: a threaded HTTP server on a free local port. Subclasses
+    implement route(method, path, query, body) -> (status, payload, route name);
+    requests are counted per method and route name.
+    """
+
+    def __init__(self, latency=0.0, seed=0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.throttled = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+            # Headers and body go out in separate writes; with Nagle on, delayed
+            # ACKs would add ~40 ms to every response on a kept-alive connection
+            disable_nagle_algorithm = True
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                url = urlparse(self.path)
+                content_type = self.headers.get("Content-Type") or "application/json"
+                body = None
+                if raw:
+                    body = json.loads(raw) if "json" in content_type else RawBody(content_type, raw)
+                status, payload, headers = server.dispatch(self.command, url.path, parse_qs(url.query), body)
+                if isinstance(payload, RawBody):
+                    content_type, data = payload
+                else:
+                    content_type = "application/json"
+                    data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def dispatch(self, method, path, query, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            throttle = self.should_throttle()
+        if throttle:
+            self._count(method, "throttled")
+            with self.lock:
+                self.throttled += 1
+            return 429, {"message": "Too many requests"}, self.throttle_headers()
+        try:
+            status, payload, route = self.route(method, path, query, body)
+        except KeyError as e:
+            status, payload, route = 404, {"message": f"Not found: {e}"}, "unknown"
+        self._count(method, route)
+        return status, payload, {}
+
+    def _count(self, method, route):
+        with self.lock:
+            key = f"{method} {route}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def should_throttle(self):
+        return False
+
+    def throttle_headers(self):
+        return {}
+
+    def total_requests(self):
+        with self.lock:
+            return sum(self.requests.values())
+
+
+class FakeClockify(FakeServer):
+    """
+    Clockify v1 stand-in: user, projects, tags and time entries of one
+    workspace. throttle_rate is the share of requests answered with 429;
+    retry_after, if set, is sent as the Retry-After header.
+    """
+    def __init__(self, workspace_id, latency=0.0, throttle_rate=0.0, retry_after=None,
+                 max_page_size=CLOCKIFY_MAX_PAGE_SIZE, seed=0):
+        super().__init__(latency, seed)
+        self.workspace_id = workspace_id
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_page_size = max_page_size
+        self.projects = []
+        self.tags = []
+        self.entries = {}
+        self._next_id = 1
+        self.api_url = f"{self.url}/api/v1"
+        ws = re.escape(workspace_id)
+        self._routes = [
+            ("GET", re.compile(r"/api/v1/user$"), "user", self._get_user),
+            ("GET", re.compile(rf"/api/v1/workspaces/{ws}/projects$"), "projects", self._get_projects),
+            ("GET", re.compile(rf"/api/v1/workspaces/{ws}/tags$"), "tags", self._get_tags),
+            ("POST", re.compile(rf"/api/v1/workspaces/{ws}/tags$"), "tags", self._create_tag),
+            ("GET", re.compile(rf"/api/v1/workspaces/{ws}/user/(\w+)/time-entries$"), "user/time-entries",
+             self._get_entries),
+            ("DELETE", re.compile(rf"/api/v1/workspaces/{ws}/user/(\w+)/time-entries$"), "user/time-entries",
+             self._bulk_delete),
+            ("POST", re.compile(rf"/api/v1/workspaces/{ws}/time-entries$"), "time-entries", self._create_entry),
+            ("PUT", re.compile(rf"/api/v1/workspaces/{ws}/time-entries/(\w+)$"), "time-entries/{id}",
+             self._update_entry),
+            ("DELETE", re.compile(rf"/api/v1/workspaces/{ws}/time-entries/(\w+)$"), "time-entries/{id}",
+             self._delete_entry),
+        ]
+
+    def new_id(self):
+        with self.lock:
+            self._next_id += 1
+            return object_id(self._next_id)
+
+    def add_project(self, name, archived=False):
+        project = {"id": self.new_id(), "name": name, "archived": archived, "clientName": ""}
+        self.projects.append(project)
+        return project
+
+    def add_tag(self, name):
+        tag = {"id": self.new_id(), "name": name}
+        self.tags.append(tag)
+        return tag
+
+    def add_entry(self, start, end, description, project_id=None, tag_ids=()):
+        entry = {
+            "id": self.new_id(),
+            "description": description,
+            "projectId": project_id,
+            "tagIds": list(tag_ids),
+            "userId": USER_ID,
+            "timeInterval": {"start": start, "end": end}
+        }
+        with self.lock:
+            self.entries[entry["id"]] = entry
+        return entry
+
+    def should_throttle(self):
+        return self.throttle_rate and self.rng.random() < self.throttle_rate
+
+    def throttle_headers(self):
+        return {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+
+    def route(self, method, path, query, body):
+        for route_method, pattern, name, handler in self._routes:
+            if route_method == method:
+                match = pattern.match(path)
+                if match:
+                    status, payload = handler(query, body, *match.groups())
+                    return status, payload, name
+        raise KeyError(f"{method} {path}")
+
+    def _page(self, items, query):
+        page = int(query.get("page", ["1"])[0])
+        size = min(int(query.get("page-size", ["50"])[0]), self.max_page_size)
+        return items[(page - 1) * size:page * size]
+
+    def _get_user(self, query, body):
+        return 200, {"id": USER_ID}
+
+    def _get_projects(self, query, body):
+        # Like Clockify: without the filter, archived projects are listed too
+        archived = query.get("archived", [None])[0]
+        projects = [p for p in self.projects if archived is None or p["archived"] == (archived == "true")]
+        return 200, self._page(projects, query)
+
+    def _get_tags(self, query, body):
+        return 200, list(self.tags)
+
+    def _create_tag(self, query, body):
+        return 201, self.add_tag(body["name"])
+
+    def _get_entries(self, query, body, user_id):
+        start = _parse_time(query["start"][0])
+        end = _parse_time(query["end"][0])
+        tags = set(query.get("tags", []))
+        with self.lock:
+            entries = [
+                e for e in self.entries.values()
+                if start <= _parse_time(e["timeInterval"]["start"]) <= end
+                and (not tags or tags & set(e["tagIds"]))
+            ]
+        # Clockify lists the newest entries first
+        entries.sort(key=lambda e: e["timeInterval"]["start"], reverse=True)
+        return 200, self._page(entries, query)
+
+    def _create_entry(self, query, body):
+        entry = self.add_entry(body["start"], body["end"], body.get("description", ""),
+                               body.get("projectId"), body.get("tagIds", []))
+        return 201, entry
+
+    def _update_entry(self, query, body, entry_id):
+        with self.lock:
+            entry = self.entries.get(entry_id)
+            if entry is None:
+                return 404, {"message": "Time entry not found"}
+            entry.update(description=body.get("description", ""), projectId=body.get("projectId"),
+                         tagIds=body.get("tagIds", []), timeInterval={"start": body["start"], "end": body["end"]})
+            return 200, entry
+
+    def _delete_entry(self, query, body, entry_id):
+        with self.lock:
+            if self.entries.pop(entry_id, None) is None:
+                return 404, {"message": "Time entry not found"}
+        return 204, None
+
+    def _bulk_delete(self, query, body, user_id):
+        with self.lock:
+            deleted = [self.entries.pop(i) for i in query.get("time-entry-ids", []) if i in self.entries]
+        return 200, deleted
+
+
+class FakeCalendar(FakeServer):
+    """
+    Google Calendar events.list stand-in serving fixed event lists per
+    calendar ID. page_size caps maxResults, so callers have to follow
+    nextPageToken like they do against Google. events.list calls can also
+    come as a multipart batch request, as the API client sends them.
+    """
+    EVENTS_PATH = re.compile(r".*/calendars/([^/]+)/events$")
+    BATCH_PATH = "/batch/calendar/v3"
+
+    def __init__(self, latency=0.0, page_size=2500, seed=0):
+        super().__init__(latency, seed)
+        self.page_size = page_size
+        self.calendars = {}
+        # CalendarClient appends the API's relative paths to this base
+        self.api_url = f"{self.url}/calendar/v3/"
+
+    def set_events(self, calendar_id, events):
+        self.calendars[calendar_id] = sorted(events, key=lambda e: e["start"].get("dateTime") or e["start"]["date"])
+
+    def route(self, method, path, query, body):
+        if method == "POST" and path == self.BATCH_PATH:
+            return 200, self._batch(body), "batch"
+        match = self.EVENTS_PATH.match(path)
+        if method != "GET" or not match:
+            raise KeyError(f"{method} {path}")
+        status, payload = self._list_events(match, query)
+        return status, payload, "events.list"
+
+    def _batch(self, body):
+        """
+        Answer a multipart/mixed batch: every part is an HTTP request line
+        plus headers, answered by a part with the same Content-ID prefixed
+        with 'response-', which is how the API client pairs them up.
+        """
+        header = f"Content-Type: {body.content_type}\r\n\r\n".encode("utf-8")
+        message = BytesParser().parsebytes(header + body.data)
+        boundary = f"batch_{self.rng.getrandbits(64):016x}"
+        parts = []
+        for part in message.get_payload():
+            request_line = part.get_payload().split("\n", 1)[0].strip()
+            method, target, _ = request_line.split(" ", 2)
+            url = urlparse(target)
+            match = self.EVENTS_PATH.match(url.path)
+            if method == "GET" and match:
+                status, payload = self._list_events(match, parse_qs(url.query))
+            else:
+                status, payload = 404, {"message": f"Not found: {method} {url.path}"}
+            self._count(method, "batch/events.list")
+            content_id = part["Content-ID"]
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:]}\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\n"
+                f"Content-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        data = "".join(parts) + f"--{boundary}--\r\n"
+        return RawBody(f"multipart/mixed; boundary={boundary}", data.encode("utf-8"))
+
+    def _list_events(self, match, query):
+        # The client percent-encodes the ID ('bench%40example.com')
+        events = self.calendars.get(unquote(match.group(1)), [])
+        if "syncToken" in query:
+            # Nothing changes between runs of a benchmark scenario
+            return 200, {"items": [], "nextSyncToken": "sync-1"}
+
+        time_min = query.get("timeMin", [None])[0]
+        time_max = query.get("timeMax", [None])[0]
+        if time_min or time_max:
+            low = _parse_time(time_min) if time_min else None
+            high = _parse_time(time_max) if time_max else None
+            selected = []
+            for event in events:
+                start = event["start"].get("dateTime") or event["start"]["date"] + "T00:00:00Z"
+                end = event["end"].get("dateTime") or event["end"]["date"] + "T00:00:00Z"
+                if (low is None or _parse_time(end) > low) and (high is None or _parse_time(start) < high):
+                    selected.append(event)
+            events = selected
+
+        offset = int(query.get("pageToken", ["0"])[0])
+        size = min(int(query.get("maxResults", ["250"])[0]), self.page_size)
+        result = {"items": events[offset:offset + size]}
+        if offset + size < len(events):
+            result["nextPageToken"] = str(offset + size)
+        else:
+            result["nextSyncToken"] = "sync-1"
+        return 200, result
@@ -1,25 +1,261 @@
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import time
+from collections import defaultdict
+from datetime import date
+from urllib.parse import urlsplit
+from metrics import METRICS
+from progress import PROGRESS
+from time_entry_index import to_instant
+
+# Only the fields process_events reads; keeps the partial response small.
+EVENT_FIELDS = (
+    "nextPageToken,"
+    "items(id,iCalUID,originalStartTime,summary,description,start,end,"
+    "organizer(email),attendees(email,responseStatus))"
+)
+# Incremental listings also need the status and version of every change
+CHANGE_FIELDS = (
+    "nextPageToken,nextSyncToken,"
+    "items(id,status,etag,updated,summary,description,start,end,"
+    "organizer(email),attendees(email,responseStatus))"
+)
+MAX_RESULTS = 2500  # Largest page size events().list accepts
+BATCH_LIMIT = 50  # Most calls Google accepts in one batch request
+BATCH_PATH = "/batch/calendar/v3"
+
+
+class SyncTokenExpired(Exception):
+    """The stored sync token was rejected (410 Gone); a full sync is required."""
+
+
+def event_day(event):
+    """
+    Return the local calendar day an event starts on.
+    """
+    start = event.get("start", {})
+    value = start.get("dateTime") or start.get("date")
+    return date.fromisoformat(value[:10])
+
+
+def split_calendar_ids(value):
+    """
+    Calendar IDs from a comma-separated string (as in GOOGLE_CALENDAR_ID) or
+    a list, in order and without repeats.
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(dict.fromkeys(v.strip() for v in value if v and v.strip()))
+
+
+def _event_key(event):
+    # With singleEvents every instance of a recurring event shares its
+    # iCalUID; the original start tells the instances apart.
+    if not event.get("iCalUID"):
+        return ("id", event.get("id"))
+    # Calendars may report the same start in different offsets, so compare instants
+    original = event.get("originalStartTime") or event.get("start", {})
+    return (event["iCalUID"], to_instant(original.get("dateTime") or original.get("date")))
+
+
+def _start_instant(event):
+    start = event.get("start", {})
+    return to_instant(start.get("dateTime") or start.get("date"))
+
+
+def merge_events(event_lists):
+    """
+    Merge the events of several calendars into one stream in start order.
+    An event on more than one calendar (e.g. a meeting on the primary and a
+    shared project calendar) is kept once, as listed by the first calendar.
+    """
+    merged = {}
+    for events in event_lists:
+        for event in events:
+            merged.setdefault(_event_key(event), event)
+    return sorted(merged.values(), key=_start_instant)
+
+
+def batch_uri(api_endpoint):
+    """
+    The batch endpoint of the server behind api_endpoint. The API client
+    derives it from the discovery document, which always names Google.
+    """
+    parts = urlsplit(api_endpoint)
+    return f"{parts.scheme}://{parts.netloc}{BATCH_PATH}"
+
+
+def load_credentials(credentials_path):
+    from google.oauth2 import service_account
+
+    return service_account.Credentials.from_service_account_file(
+        credentials_path,
+        scopes=['https://www.googleapis.com/auth/calendar.readonly']
+    )
+
+
+def execute(request, endpoint="events.list"):
+    """
+    Execute a Google API request, recording its latency and outcome.
+    """
+    PROGRESS.request()
+    started = time.perf_counter()
+    status = "error"
+    try:
+        result = request.execute()
+        status = 200
+        return result
+    except Exception as e:
+        resp = getattr(e, "resp", None)
+        if resp is not None:
+            status = resp.status
+        raise
+    finally:
+        METRICS.observe_request("calendar", endpoint, status, time.perf_counter() - started)
+
 
 class CalendarClient:
-    def __init__(self, credentials_path, calendar_id):
-        creds = service_account.Credentials.from_service_account_file(
-            credentials_path,
-            scopes=['https://www.googleapis.com/auth/calendar.readonly']
+    """
+    Reads events from one or more Google calendars. calendar_id is a single
+    ID, a comma-separated string or a list; several calendars are listed
+    with batch requests and merged into one deduplicated stream.
+    """
+    def __init__(self, credentials_path, calendar_id, credentials=None, api_endpoint=None):
+        # The Google client libraries are slow to import, so only load them
+        # once a calendar is actually needed.
+        from googleapiclient.discovery import build
+
+        if credentials is None and api_endpoint and not credentials_path:
+            # A local stand-in such as the benchmark's fake server needs no auth
+            from google.auth.credentials import AnonymousCredentials
+            credentials = AnonymousCredentials()
+        # Callers syncing several calendars pass one shared credentials object
+        creds = credentials or load_credentials(credentials_path)
+        # static_discovery uses the discovery document bundled with
+        # google-api-python-client instead of downloading it on every start.
+        self.service = build(
+            'calendar', 'v3', credentials=creds, static_discovery=True, cache_discovery=False,
+            client_options={"api_endpoint": api_endpoint} if api_endpoint else None
         )
-        self.service = build('calendar', 'v3', credentials=creds)
-        self.calendar_id = calendar_id
+        self.api_endpoint = api_endpoint
+        self.calendar_ids = split_calendar_ids(calendar_id)
+        # The key sync state and plans are stored under
+        self.calendar_id = ",".join(self.calendar_ids)
 
-    def get_events_in_range(self, start_iso, end_iso):
-        """
-        Fetch events between the specified ISO 8601 start and end times.
-        """
-        events_result = self.service.events().list(
-            calendarId=self.calendar_id,
+    def _list_request(self, calendar_id, start_iso, end_iso, page_token):
+        return self.service.events().list(
+            calendarId=calendar_id,
             timeMin=start_iso,
             timeMax=end_iso,
             singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+            orderBy='startTime',
+            maxResults=MAX_RESULTS,
+            fields=EVENT_FIELDS,
+            pageToken=page_token
+        )
+
+    def get_events_in_range(self, start_iso, end_iso):
+        """
+        Fetch events between the specified ISO 8601 start and end times,
+        following every result page. With several calendars, each round of
+        pages goes out as one batch request, so listing N calendars costs
+        about as many round trips as the longest one has pages.
+        """
+        if len(self.calendar_ids) > 1:
+            return self._get_events_batched(start_iso, end_iso)
+        events = []
+        page_token = None
+        while True:
+            events_result = execute(self._list_request(self.calendar_id, start_iso, end_iso, page_token))
+            events.extend(events_result.get('items', []))
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                break
+
+        return events
+
+    def _get_events_batched(self, start_iso, end_iso):
+        events = {calendar_id: [] for calendar_id in self.calendar_ids}
+        page_tokens = dict.fromkeys(self.calendar_ids)
+        while page_tokens:
+            results = self._execute_batch({
+                calendar_id: self._list_request(calendar_id, start_iso, end_iso, page_token)
+                for calendar_id, page_token in page_tokens.items()
+            })
+            page_tokens = {}
+            for calendar_id, result in results.items():
+                events[calendar_id].extend(result.get("items", []))
+                if result.get("nextPageToken"):
+                    page_tokens[calendar_id] = result["nextPageToken"]
+        return merge_events(events[calendar_id] for calendar_id in self.calendar_ids)
+
+    def _execute_batch(self, requests):
+        """
+        Send {request_id: request} as batch requests of up to BATCH_LIMIT
+        calls. Returns {request_id: response}; the first failed call is raised.
+        """
+        responses = {}
+        errors = []
+
+        def collect(request_id, response, exception):
+            if exception is not None:
+                errors.append(exception)
+            else:
+                responses[request_id] = response
+
+        request_ids = list(requests)
+        for i in range(0, len(request_ids), BATCH_LIMIT):
+            if self.api_endpoint:
+                from googleapiclient.http import BatchHttpRequest
+                batch = BatchHttpRequest(callback=collect, batch_uri=batch_uri(self.api_endpoint))
+            else:
+                batch = self.service.new_batch_http_request(callback=collect)
+            for request_id in request_ids[i:i + BATCH_LIMIT]:
+                batch.add(requests[request_id], request_id=request_id)
+            execute(batch, endpoint="batch")
+        if errors:
+            raise errors[0]
+        return responses
+
+    def get_events_by_day(self, start_iso, end_iso):
+        """
+        Fetch the whole range in one paginated pass and group the events
+        by the local day they start on.
+        """
+        events_by_day = defaultdict(list)
+        for event in self.get_events_in_range(start_iso, end_iso):
+            events_by_day[event_day(event)].append(event)
+        return events_by_day
+
+    def list_changes(self, sync_token=None, time_min=None):
+        """
+        Return (events, next_sync_token). Without a sync token this is the
+        initial full listing from time_min onward; with one, only events
+        changed since that token are returned, including cancelled ones.
+        """
+        from googleapiclient.errors import HttpError
 
-        return events_result.get('items', [])
+        if len(self.calendar_ids) > 1:
+            raise ValueError("Incremental sync supports a single calendar")
+        events = []
+        page_token = None
+        while True:
+            params = {
+                "calendarId": self.calendar_id,
+                "singleEvents": True,
+                "maxResults": MAX_RESULTS,
+                "fields": CHANGE_FIELDS,
+                "pageToken": page_token
+            }
+            if sync_token:
+                params["syncToken"] = sync_token
+            elif time_min:
+                params["timeMin"] = time_min
+            try:
+                result = execute(self.service.events().list(**params))
+            except HttpError as e:
+                if e.resp.status == 410:
+                    raise SyncTokenExpired(str(e))
+                raise
+            events.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return events, result.get("nextSyncToken")
@@ -14,6 +14,13 @@ a = Analysis(
     noarchive=False,
     optimize=0,
 )
+# google-api-python-client ships discovery documents for every Google API.
+# Only the Calendar one is used, and the one-file binary unpacks every data
+# file on each start, so drop the rest.
+a.datas = [
+    entry for entry in a.datas
+    if 'discovery_cache' not in entry[0].replace('\\', '/') or entry[0].endswith('calendar.v3.json')
+]
 pyz = PYZ(a.pure)
 
 exe = EXE(
@@ -1,113 +1,245 @@
+import email.utils
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
 import requests
+from requests.adapters import HTTPAdapter
+from metadata_cache import MetadataCache
+from metrics import METRICS
+from progress import PROGRESS
+from project_catalog import format_projects
+from rate_limiter import TokenBucket
+
+CLOCKIFY_API_URL = "https://api.clockify.me/api/v1"
+CLOCKIFY_RATE_LIMIT = 50  # Requests per second allowed per API key
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+REQUEST_TIMEOUT = (10, 60)  # (connect, read) seconds, so a stalled connection is retried instead of hanging
+OBJECT_ID = re.compile(r"/[0-9a-f]{24}(?=/|$)")  # Clockify IDs, collapsed for endpoint labels
+
 
 class ClockifyClient:
-    def __init__(self, api_key, workspace_id):
+    def __init__(self, api_key, workspace_id, pool_size=10, rate_limit=CLOCKIFY_RATE_LIMIT,
+                 max_retries=5, backoff_factor=0.5, max_backoff=30, api_url=CLOCKIFY_API_URL,
+                 metadata=None, timeout=REQUEST_TIMEOUT):
         self.api_key = api_key
         self.workspace_id = workspace_id
-        self.base_url = f"https://api.clockify.me/api/v1/workspaces/{workspace_id}"
-        self._project_cache = None
-        self._tag_cache = None
-        self._user_id = None
+        self.api_url = api_url.rstrip("/")
+        self.base_url = f"{self.api_url}/workspaces/{workspace_id}"
+        # Projects, tags and user ID; may be shared with other clients of the workspace
+        self.metadata = metadata or MetadataCache(workspace_id)
+
+        # One pooled keep-alive session shared by every call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"X-Api-Key": api_key})
+        self.limiter = TokenBucket(rate_limit)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "throttle_wait": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def stats_snapshot(self):
+        """A copy of the cumulative request stats, e.g. to report one daemon cycle's share."""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _endpoint(self, method, url):
+        """
+        Metrics label for a request, e.g. 'GET /workspaces/{id}/tags'.
+        """
+        path = url[len(self.api_url):] if url.startswith(self.api_url) else url
+        return f"{method} {OBJECT_ID.sub('/{id}', path)}"
+
+    def _retry_delay(self, attempt, response=None):
+        """
+        Seconds to wait before the next attempt: the server's Retry-After if
+        given and valid, otherwise exponential backoff with full jitter.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0), self.max_backoff)
+            except ValueError:
+                pass
+            try:
+                retry_at = email.utils.parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                retry_at = None  # Malformed header: fall back to backoff
+            if retry_at is not None:
+                if retry_at.tzinfo is None:
+                    retry_at = retry_at.replace(tzinfo=timezone.utc)  # HTTP dates are always GMT
+                return min(max(retry_at.timestamp() - time.time(), 0), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    def _request(self, method, url, **kwargs):
+        """
+        Send a request through the shared session, respecting the client-side
+        rate limit and retrying 429s (and 5xx, connection errors and timeouts
+        for idempotent methods) with backoff. Returns the final response.
+        """
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = self._endpoint(method, url)
+        attempt = 0
+        while True:
+            PROGRESS.request()
+            waited = self.limiter.acquire()
+            if waited:
+                self._count("throttle_wait", waited)
+            self._count("requests")
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                METRICS.observe_request("clockify", endpoint, "error", time.perf_counter() - started)
+                if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+                    raise
+                response = None
+            else:
+                METRICS.observe_request("clockify", endpoint, response.status_code, time.perf_counter() - started)
+                if response.status_code == 429:
+                    self._count("throttled")
+                retryable = response.status_code == 429 or (
+                    response.status_code in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+                )
+                if not retryable or attempt >= self.max_retries:
+                    return response
+            self._count("retries")
+            time.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    def fetch_user_id(self):
+        response = self._request("GET", f"{self.api_url}/user")
+        response.raise_for_status()
+        return response.json()["id"]
 
     def get_user_id(self):
-        if self._user_id:
-            return self._user_id
-        headers = {"X-Api-Key": self.api_key}
-        response = requests.get("https://api.clockify.me/api/v1/user", headers=headers)
+        return self.metadata.user_id(self)
+
+    def _get_project_page(self, page, page_size, include_archived):
+        params = {"page": page, "page-size": page_size}
+        if not include_archived:
+            params["archived"] = "false"  # Without the filter Clockify returns archived projects too
+        response = self._request("GET", f"{self.base_url}/projects", params=params)
         response.raise_for_status()
-        self._user_id = response.json()["id"]
-        return self._user_id
+        return response.json()
 
-    def get_projects(self, include_archived=False):
-        headers = {"X-Api-Key": self.api_key}
+    def get_projects(self, include_archived=False, page_size=100, parallel=4):
+        """
+        Fetch every project page. Up to `parallel` pages are requested
+        concurrently, speculating that the workspace has more pages; the
+        listing ends at the first short page and later pages are discarded.
+        """
         all_projects = []
-        page = 1
-        page_size = 100
-
-        while True:
-            params = {
-                "page": page,
-                "page-size": page_size,
-                "archived": "true" if include_archived else "false"
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            pending = {
+                page: executor.submit(self._get_project_page, page, page_size, include_archived)
+                for page in range(1, max(1, parallel) + 1)
             }
-            response = requests.get(
-                f"{self.base_url}/projects",
-                headers=headers,
-                params=params
-            )
-            response.raise_for_status()
-            projects = response.json()
-            all_projects.extend(projects)
-            if len(projects) < page_size:
-                break  # No more pages
-            page += 1
+            page = 1
+            while True:
+                projects = pending.pop(page).result()
+                all_projects.extend(projects)
+                if len(projects) < page_size:
+                    break  # No more pages
+                next_page = page + len(pending) + 1
+                pending[next_page] = executor.submit(self._get_project_page, next_page, page_size, include_archived)
+                page += 1
+            for future in pending.values():
+                future.cancel()
 
         return all_projects
 
+    def fetch_tags(self):
+        response = self._request("GET", f"{self.base_url}/tags")
+        response.raise_for_status()
+        return response.json()
 
     def resolve_project_name(self, project_name):
-        if self._project_cache is None:
-            self._project_cache = self.get_projects()
-
-        for proj in self._project_cache:
-            if proj["name"] == project_name:
-                return proj["id"]
-        return None
+        return self.metadata.project_id(self, project_name)
 
     def ensure_tag(self, tag_name="calendar-bot"):
-        if self._tag_cache is None:
-            headers = {"X-Api-Key": self.api_key}
-            response = requests.get(f"{self.base_url}/tags", headers=headers)
-            response.raise_for_status()
-            self._tag_cache = response.json()
+        return self.metadata.ensure_tag(self, tag_name, lambda: self._create_tag(tag_name))
 
-        for tag in self._tag_cache:
-            if tag["name"] == tag_name:
-                return tag["id"]
-
-        # Create the tag if it doesn't exist
-        headers = {
-            "X-Api-Key": self.api_key,
-            "Content-Type": "application/json"
-        }
-        tag_data = {"name": tag_name}
-        response = requests.post(f"{self.base_url}/tags", headers=headers, json=tag_data)
+    def _create_tag(self, tag_name):
+        response = self._request("POST", f"{self.base_url}/tags", json={"name": tag_name})
         response.raise_for_status()
-        new_tag = response.json()
-        self._tag_cache.append(new_tag)
-        return new_tag["id"]
+        return response.json()
 
     def get_tag_map(self):
-        headers = {"X-Api-Key": self.api_key}
-        response = requests.get(f"{self.base_url}/tags", headers=headers)
-        response.raise_for_status()
-        tags = response.json()
-        return {tag["id"]: tag["name"] for tag in tags}
+        return self.metadata.tag_map(self)
+
+    def get_tag_id(self, tag_name):
+        """
+        Return the ID of an existing tag, or None. Unlike ensure_tag, never creates it.
+        """
+        return self.metadata.tag_id(self, tag_name)
 
-    def get_time_entries(self, start, end):
+    def get_time_entries(self, start, end, page_size=1000, tag_ids=None):
         """
-        Retrieve time entries for the current user between start and end (ISO strings).
+        Retrieve time entries for the current user between start and end (ISO strings),
+        following every result page. tag_ids restricts the results server-side.
         """
         user_id = self.get_user_id()
-        headers = {"X-Api-Key": self.api_key}
-        params = {
-            "start": start,
-            "end": end
-        }
         url = f"{self.base_url}/user/{user_id}/time-entries"
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        all_entries = []
+        page = 1
+
+        while True:
+            params = {
+                "start": start,
+                "end": end,
+                "page": page,
+                "page-size": page_size
+            }
+            if tag_ids:
+                params["tags"] = list(tag_ids)
+            response = self._request("GET", url, params=params)
+            response.raise_for_status()
+            entries = response.json()
+            all_entries.extend(entries)
+            if len(entries) < page_size:
+                break  # No more pages
+            page += 1
+
+        return all_entries
 
     def create_time_entry(self, start, end, description, project_id, tags=None):
         """
         Create a time entry in Clockify, tagged with 'calendar-bot'.
         """
         tag_id = self.ensure_tag()
-        headers = {
-            "X-Api-Key": self.api_key,
-            "Content-Type": "application/json"
+
+        payload = {
+            "start": start,
+            "end": end,
+            "description": description,
+            "tagIds": [tag_id]
         }
+        if project_id:
+            payload["projectId"] = project_id
+
+        response = self._request("POST", f"{self.base_url}/time-entries", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def update_time_entry(self, entry_id, start, end, description, project_id):
+        """
+        Replace the interval, description and project of an existing bot entry.
+        """
+        tag_id = self.ensure_tag()
 
         payload = {
             "start": start,
@@ -118,24 +250,34 @@ class ClockifyClient:
         if project_id:
             payload["projectId"] = project_id
 
-        response = requests.post(f"{self.base_url}/time-entries", headers=headers, json=payload)
+        response = self._request("PUT", f"{self.base_url}/time-entries/{entry_id}", json=payload)
         response.raise_for_status()
         return response.json()
 
-    def delete_time_entry(self, entry_id):
-        headers = {"X-Api-Key": self.api_key}
+    def delete_time_entry(self, entry_id, missing_ok=False):
+        """
+        Delete one time entry. With missing_ok an entry that no longer exists
+        (404) is not an error. Returns False if it was already gone.
+        """
         url = f"{self.base_url}/time-entries/{entry_id}"
-        response = requests.delete(url, headers=headers)
+        response = self._request("DELETE", url)
+        if response.status_code == 404 and missing_ok:
+            return False
         if response.status_code != 204:
             raise Exception(f"Failed to delete time entry {entry_id}: {response.status_code} {response.text}")
+        return True
+
+    def delete_time_entries(self, entry_ids):
+        """
+        Delete several time entries of the current user with one bulk request.
+        Returns the deleted entries.
+        """
+        user_id = self.get_user_id()
+        url = f"{self.base_url}/user/{user_id}/time-entries"
+        response = self._request("DELETE", url, params={"time-entry-ids": list(entry_ids)})
+        response.raise_for_status()
+        return response.json()
 
     def list_all_projects(self, include_archived=False):
         """Print all projects in the workspace with basic details."""
-        projects = self.get_projects(include_archived=include_archived)
-        print(f"{'Project Name':40} | {'ID':30} | Archived")
-        print("-" * 90)
-        for project in projects:
-            print(
-                f"{project['name'][:40]:40} | {project['id']} | {project['archived']}"
-            )
-
+        print(format_projects(self.metadata.projects(self, include_archived)))
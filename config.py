@@ -0,0 +1,106 @@
+import os
+import yaml
+from clockify_client import CLOCKIFY_API_URL, CLOCKIFY_RATE_LIMIT, ClockifyClient
+from matcher import compile_rules
+from metadata_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, MetadataCache, cache_path
+
+class ConfigError(Exception):
+    pass
+
+def load_rules(path="rules.yaml"):
+    """
+    Load and compile a rules file into a RuleEngine.
+    """
+    if not os.path.exists(path):
+        raise ConfigError(f"[ERROR] {path} file is missing. Please provide a rules file.")
+    try:
+        with open(path, "r") as f:
+            rules = yaml.safe_load(f)
+    except Exception as e:
+        raise ConfigError(f"[ERROR] Failed to load {path}: {e}")
+    if not rules or not isinstance(rules, dict):
+        raise ConfigError(f"[ERROR] {path} is empty or not a valid mapping. Please check its contents.")
+    try:
+        return compile_rules(rules)
+    except ValueError as e:
+        raise ConfigError(f"[ERROR] Invalid {path}: {e}")
+
+def load_ignored_attendees(path="ignored_attendees.yaml"):
+    """
+    Return (ignored_emails, self_email). The file is optional.
+    """
+    ignored_emails = set()
+    self_email = None
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                data = yaml.safe_load(f)
+        except Exception as e:
+            raise ConfigError(f"[ERROR] Failed to load {path}: {e}")
+        if not isinstance(data, dict):
+            raise ConfigError(f"[ERROR] {path} must be a mapping with 'ignored_emails' and 'self_email'.")
+        ignored_emails = set(data.get("ignored_emails", []))
+        self_email = data.get("self_email")
+        if not isinstance(ignored_emails, set) or not all(isinstance(e, str) for e in ignored_emails):
+            raise ConfigError(f"[ERROR] 'ignored_emails' in {path} must be a list of strings.")
+        if self_email is not None and not isinstance(self_email, str):
+            raise ConfigError(f"[ERROR] 'self_email' in {path} must be a string.")
+    return ignored_emails, self_email
+
+def read_env(env_vars):
+    """
+    Read (name, hint, required) environment variables into a dict, None for
+    unset ones. A missing required variable raises ConfigError with its hint.
+    """
+    config = {}
+    for var, hint, required in env_vars:
+        value = os.getenv(var)
+        if required and not value:
+            raise ConfigError(f"[ERROR] Missing environment variable: {var}. Hint: {hint}")
+        config[var] = value
+    return config
+
+def load_clockify_settings(required=True):
+    """
+    Read the CLOCKIFY_* environment settings used by build_clockify_client,
+    with the numeric ones parsed. The API key and workspace ID must be set
+    when required.
+    """
+    config = read_env([
+        ("CLOCKIFY_API_KEY", "Clockify API key (set CLOCKIFY_API_KEY)", required),
+        ("CLOCKIFY_WORKSPACE_ID", "Clockify workspace ID (set CLOCKIFY_WORKSPACE_ID)", required),
+        ("CLOCKIFY_RATE_LIMIT", "Client-side Clockify request limit per second (set CLOCKIFY_RATE_LIMIT)", False),
+        ("CLOCKIFY_POOL_SIZE", "Clockify HTTP connection pool size (set CLOCKIFY_POOL_SIZE)", False),
+        ("CLOCKIFY_API_URL", "Clockify API base URL, e.g. a local fake server (set CLOCKIFY_API_URL)", False),
+        ("CLOCKIFY_CACHE_DIR", "Directory for cached Clockify projects/tags (set CLOCKIFY_CACHE_DIR)", False),
+        ("CLOCKIFY_CACHE_TTL", "Seconds before cached Clockify metadata is refreshed (set CLOCKIFY_CACHE_TTL)", False)
+    ])
+    for var in ("CLOCKIFY_RATE_LIMIT", "CLOCKIFY_POOL_SIZE", "CLOCKIFY_CACHE_TTL"):
+        if config[var] is not None:
+            try:
+                config[var] = int(config[var]) if var == "CLOCKIFY_POOL_SIZE" else float(config[var])
+            except ValueError:
+                raise ConfigError(f"[ERROR] Environment variable {var} must be a number.")
+            if config[var] <= 0:
+                raise ConfigError(f"[ERROR] Environment variable {var} must be positive.")
+    return config
+
+def build_metadata_cache(config, workspace_id):
+    return MetadataCache(
+        workspace_id,
+        path=cache_path(workspace_id, config["CLOCKIFY_CACHE_DIR"] or DEFAULT_CACHE_DIR),
+        ttl=config["CLOCKIFY_CACHE_TTL"] or DEFAULT_TTL
+    )
+
+def build_clockify_client(config, api_key, workspace_id, concurrency, metadata=None):
+    """
+    Build a ClockifyClient from the environment settings in config. Pass a
+    shared metadata cache when several clients use the same workspace.
+    """
+    return ClockifyClient(
+        api_key, workspace_id,
+        pool_size=max(config["CLOCKIFY_POOL_SIZE"] or 10, concurrency),
+        rate_limit=config["CLOCKIFY_RATE_LIMIT"] or CLOCKIFY_RATE_LIMIT,
+        api_url=config["CLOCKIFY_API_URL"] or CLOCKIFY_API_URL,
+        metadata=metadata or build_metadata_cache(config, workspace_id)
+    )
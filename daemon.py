@@ -0,0 +1,147 @@
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from config import ConfigError, load_ignored_attendees, load_rules
+from progress import PROGRESS, Cancelled
+from run_log import SUMMARY, log
+
+RULES_FILE = "rules.yaml"
+IGNORED_ATTENDEES_FILE = "ignored_attendees.yaml"
+DEFAULT_WORK_HOURS = "8-19"
+
+
+def parse_work_hours(value):
+    """Parse 'START-END' (local hours, END exclusive) into (start, end)."""
+    try:
+        start, end = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise ConfigError(f"[ERROR] --work-hours must look like 8-19, not '{value}'.")
+    if not 0 <= start < end <= 24:
+        raise ConfigError("[ERROR] --work-hours must be two hours from 0 to 24, the first before the second.")
+    return start, end
+
+
+class Schedule:
+    """
+    Polling intervals for the daemon: every `interval` seconds during working
+    hours (Monday to Friday, local time), every `idle_interval` seconds at
+    night and on weekends.
+    """
+    def __init__(self, interval, idle_interval, work_hours=(8, 19)):
+        self.interval = interval
+        self.idle_interval = idle_interval
+        self.work_start, self.work_end = work_hours
+
+    def working(self, now):
+        return now.weekday() < 5 and self.work_start <= now.hour < self.work_end
+
+    def next_delay(self, now):
+        """Seconds to wait after a cycle that ended at `now` (a local datetime)."""
+        if self.working(now):
+            return self.interval
+        # Don't sleep through the start of the working day
+        start = now.replace(hour=self.work_start, minute=0, second=0, microsecond=0)
+        if start <= now:
+            start += timedelta(days=1)
+        while start.weekday() >= 5:
+            start += timedelta(days=1)
+        return max(1, min(self.idle_interval, (start - now).total_seconds()))
+
+
+class ConfigWatcher:
+    """
+    Reload rules.yaml and ignored_attendees.yaml into config when their
+    modification time changes. A file that fails to load is reported and the
+    previous settings stay in effect until it is fixed.
+    """
+    def __init__(self, config, rules_path=RULES_FILE, ignored_path=IGNORED_ATTENDEES_FILE):
+        self.config = config
+        self.rules_path = rules_path
+        self.ignored_path = ignored_path
+        self._mtimes = {path: self._mtime(path) for path in (rules_path, ignored_path)}
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload_changed(self):
+        """Reload the files changed since the last check. Returns the paths reloaded."""
+        reloaded = []
+        for path in (self.rules_path, self.ignored_path):
+            mtime = self._mtime(path)
+            if mtime == self._mtimes[path]:
+                continue
+            try:
+                if path == self.rules_path:
+                    self.config["rules"] = load_rules(path)
+                else:
+                    self.config["ignored_emails"], self.config["self_email"] = load_ignored_attendees(path)
+            except ConfigError as e:
+                # Retried on the next change; a half-saved file must not stop the daemon
+                log.error("Keeping the previous settings: %s", str(e).replace("[ERROR] ", ""))
+            else:
+                reloaded.append(path)
+            self._mtimes[path] = mtime
+        return reloaded
+
+
+class Daemon:
+    """
+    Run sync cycles on a Schedule in one long-lived process, so the clients,
+    the OAuth token and the metadata cache stay warm between cycles. The
+    first SIGTERM or SIGINT lets the current cycle finish and then exits;
+    a second one cancels the cycle at its next API call.
+    """
+    def __init__(self, cycle, schedule, watcher, lookback_days=0):
+        self.cycle = cycle
+        self.schedule = schedule
+        self.watcher = watcher
+        self.lookback_days = lookback_days
+        self.stopping = threading.Event()
+
+    def _handle_signal(self, signum, frame):
+        if self.stopping.is_set():
+            log.warning("Second %s: cancelling the current cycle", signal.Signals(signum).name)
+            PROGRESS.cancel()
+            return
+        log.info("%s received; stopping after the current cycle", signal.Signals(signum).name, extra=SUMMARY)
+        self.stopping.set()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+    def run_cycle(self):
+        for path in self.watcher.reload_changed():
+            log.info("Reloaded %s", path, extra=SUMMARY)
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        start_date = today - timedelta(days=self.lookback_days)
+        started = time.monotonic()
+        log.info("Sync cycle for %s to %s", start_date.date(), today.date(), extra=SUMMARY)
+        try:
+            self.cycle(start_date, today)
+        except Exception:
+            # A failed cycle (e.g. an API outage) is retried on the next one
+            log.exception("Sync cycle failed")
+        else:
+            log.info("Sync cycle finished in %.1fs", time.monotonic() - started, extra=SUMMARY)
+
+    def run(self):
+        """Run cycles until stopped. Returns once the last cycle has finished."""
+        self.install_signal_handlers()
+        PROGRESS.cancelled.clear()
+        while not self.stopping.is_set():
+            try:
+                self.run_cycle()
+            except Cancelled:
+                log.warning("Sync cycle cancelled")
+                break
+            delay = self.schedule.next_delay(datetime.now())
+            log.info("Next sync in %.1f min", delay / 60, extra=SUMMARY)
+            self.stopping.wait(delay)
+        log.info("Daemon stopped", extra=SUMMARY)
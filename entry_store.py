@@ -0,0 +1,237 @@
+import base64
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from operator import sub
+from atomic_file import atomic_write_json, read_json_cache
+from metadata_cache import key_fingerprint
+from time_entry_index import to_instant
+
+STORE_VERSION = 1
+DEFAULT_TTL = 15 * 60  # Seconds before cached entries are re-downloaded; past entries can still be edited
+NO_PROJECT = -1
+
+
+def store_path(workspace_id, api_key, cache_dir):
+    """
+    Cache file for the entries one API key sees in a workspace. Time entries
+    are per user, so two keys on the same workspace must not share a file.
+    """
+    return os.path.join(cache_dir, f"{workspace_id}-{key_fingerprint(api_key)}-entries.json")
+
+
+def _encode(values):
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _decode(typecode, text):
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text))
+    return values
+
+
+class _Interner:
+    """Map strings to dense integer codes, in first-seen order."""
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class TimeEntryStore:
+    """
+    Clockify time entries in columnar form, sorted by start: start and end
+    as float arrays of UTC epochs, project IDs and descriptions as integer
+    codes into interned tables, and tag IDs as codes in a flat array with
+    per-entry offsets. Aggregates run over whole columns instead of per-entry
+    dicts, and the arrays serialize to a compact cache file.
+    Running timers (no end yet) are left out.
+    """
+    def __init__(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.project_codes = array("i")
+        self.description_codes = array("i")
+        self.tag_offsets = array("i", [0])
+        self.tag_codes = array("i")
+        self.project_ids = _Interner()
+        self.descriptions = _Interner()
+        self.tag_ids = _Interner()
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_entries(cls, entries):
+        store = cls()
+        rows = []
+        for entry in entries:
+            interval = entry.get("timeInterval") or {}
+            if not interval.get("start") or not interval.get("end"):
+                continue
+            rows.append((to_instant(interval["start"]), to_instant(interval["end"]), entry))
+        rows.sort(key=lambda row: row[0])
+        for start, end, entry in rows:
+            store.starts.append(start)
+            store.ends.append(end)
+            project_id = entry.get("projectId")
+            store.project_codes.append(store.project_ids.code(project_id) if project_id else NO_PROJECT)
+            store.description_codes.append(store.descriptions.code(entry.get("description") or ""))
+            store.tag_codes.extend(store.tag_ids.code(tag_id) for tag_id in entry.get("tagIds") or [])
+            store.tag_offsets.append(len(store.tag_codes))
+        return store
+
+    def to_dict(self):
+        return {
+            "byteorder": sys.byteorder,
+            "starts": _encode(self.starts),
+            "ends": _encode(self.ends),
+            "project_codes": _encode(self.project_codes),
+            "description_codes": _encode(self.description_codes),
+            "tag_offsets": _encode(self.tag_offsets),
+            "tag_codes": _encode(self.tag_codes),
+            "project_ids": self.project_ids.values,
+            "descriptions": self.descriptions.values,
+            "tag_ids": self.tag_ids.values
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("byteorder") != sys.byteorder:
+            raise ValueError("cache written on a machine with a different byte order")
+        store = cls()
+        store.starts = _decode("d", data["starts"])
+        store.ends = _decode("d", data["ends"])
+        store.project_codes = _decode("i", data["project_codes"])
+        store.description_codes = _decode("i", data["description_codes"])
+        store.tag_offsets = _decode("i", data["tag_offsets"])
+        store.tag_codes = _decode("i", data["tag_codes"])
+        store.project_ids = _Interner(data["project_ids"])
+        store.descriptions = _Interner(data["descriptions"])
+        store.tag_ids = _Interner(data["tag_ids"])
+        return store
+
+    def span(self, start, end):
+        """Index range (first, last) of the entries starting within start..end (UTC epochs)."""
+        return bisect_left(self.starts, start), bisect_right(self.starts, end)
+
+    def durations(self, first=0, last=None):
+        """Entry lengths in seconds for the index range first..last."""
+        return array("d", map(sub, self.ends[first:last], self.starts[first:last]))
+
+    def tag_mask(self, tag_id, first=0, last=None):
+        """One flag per entry in first..last: 1 if the entry carries tag_id."""
+        last = len(self) if last is None else last
+        code = self.tag_ids.codes.get(tag_id)
+        mask = array("b", bytes(last - first))
+        if code is None:
+            return mask
+        offsets, codes = self.tag_offsets, self.tag_codes
+        for i in range(first, last):
+            if code in codes[offsets[i]:offsets[i + 1]]:
+                mask[i - first] = 1
+        return mask
+
+    def group_keys(self, group_by, first=0, last=None):
+        """
+        One key per entry in first..last: the project code for "project",
+        the local start date for "day" and the ISO week ('2024-W07') for "week".
+        """
+        if group_by == "project":
+            return self.project_codes[first:last]
+        days = list(map(date.fromtimestamp, self.starts[first:last]))
+        if group_by == "day":
+            return days
+        weeks = {}
+        for day in set(days):
+            year, week, _ = day.isocalendar()
+            weeks[day] = f"{year}-W{week:02d}"
+        return [weeks[day] for day in days]
+
+    def summarize(self, start, end, group_by="project", bot_tag_id=None):
+        """
+        Aggregate the entries starting within start..end (UTC epochs): total
+        seconds, seconds per group key, seconds of entries tagged bot_tag_id
+        and seconds of entries without a project.
+        """
+        first, last = self.span(start, end)
+        durations = self.durations(first, last)
+        groups = {}
+        for key, seconds in zip(self.group_keys(group_by, first, last), durations):
+            groups[key] = groups.get(key, 0.0) + seconds
+        bot_seconds = sum(s for s, flag in zip(durations, self.tag_mask(bot_tag_id, first, last)) if flag)
+        unmatched = sum(s for s, code in zip(durations, self.project_codes[first:last]) if code == NO_PROJECT)
+        return {
+            "entries": last - first,
+            "total": sum(durations),
+            "groups": groups,
+            "bot": bot_seconds,
+            "unmatched": unmatched
+        }
+
+
+class EntryStoreCache:
+    """
+    On-disk cache of the TimeEntryStore for one workspace, one API key
+    (identified by its fingerprint) and one fetched range. A request is served from it while it is fresh and covers the
+    requested range; otherwise the range is downloaded and the cache replaced.
+    """
+    def __init__(self, workspace_id, fingerprint, path=None, ttl=DEFAULT_TTL):
+        self.workspace_id = workspace_id
+        self.fingerprint = fingerprint
+        self.path = path
+        self.ttl = ttl
+
+    def _read(self, start, end):
+        data = read_json_cache(self.path)
+        if data is None:
+            return None
+        try:
+            if data.get("version") != STORE_VERSION or data.get("workspace_id") != self.workspace_id:
+                return None
+            if data.get("key_fingerprint") != self.fingerprint:
+                return None
+            if time.time() - data.get("fetched_at", 0) > self.ttl:
+                return None
+            if data["range_start"] > start or data["range_end"] < end:
+                return None
+            return TimeEntryStore.from_dict(data["store"])
+        except (ValueError, KeyError):
+            return None
+
+    def _write(self, start, end, store):
+        if not self.path:
+            return
+        data = {
+            "version": STORE_VERSION,
+            "workspace_id": self.workspace_id,
+            "key_fingerprint": self.fingerprint,
+            "fetched_at": time.time(),
+            "range_start": start,
+            "range_end": end,
+            "store": store.to_dict()
+        }
+        atomic_write_json(self.path, data)
+
+    def load(self, clockify, start, end, refresh=False):
+        """
+        Return (store, cached) for the entries of start..end (ISO strings),
+        fetched from Clockify in pages of the largest size it allows unless
+        the cache covers the range.
+        """
+        start_instant, end_instant = to_instant(start), to_instant(end)
+        store = None if refresh else self._read(start_instant, end_instant)
+        if store is not None:
+            return store, True
+        store = TimeEntryStore.from_entries(clockify.get_time_entries(start, end, page_size=5000))
+        self._write(start_instant, end_instant, store)
+        return store, False
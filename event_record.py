@@ -0,0 +1,97 @@
+from enum import Enum
+
+INTERNAL_DOMAIN = "wechange.company"  # Organizers outside it are treated as external
+
+
+class SkipReason(Enum):
+    """Why an event is not logged; the value doubles as its metrics label."""
+    RECLAIM_TASK = "reclaim_task"
+    ALL_DAY = "all_day"
+    NOPROJECT_TAG = "noproject_tag"
+    NO_INVITEES = "no_invitees"
+    IGNORED_ATTENDEE_ONLY = "ignored_attendee_only"
+    EXTERNAL_WITHOUT_PARTICIPANT = "external_without_participant"
+    NOT_ACCEPTED = "not_accepted"
+    UNKNOWN_PROJECT = "unknown_project"
+    DUPLICATE = "duplicate"
+    OVERLAP = "overlap"
+    CONFLICT = "conflict"
+
+
+class EventRecord:
+    """
+    A Google Calendar event normalized once for the filter chain and the
+    rule engine: emails lowercased, attendee domains split off, the user's
+    own response and the external actor resolved, and the description
+    flags checked, so no later step re-reads or mutates the raw dict.
+    """
+    __slots__ = (
+        "event", "self_email", "summary", "description", "start", "end", "all_day",
+        "organizer_email", "attendee_emails", "attendee_domains", "other_emails", "is_organizer", "self_status",
+        "external_organizer", "external_actor_email", "reclaim_task", "noproject"
+    )
+
+    def __init__(self, event, self_email=None, internal_domain=INTERNAL_DOMAIN):
+        self.event = event
+        self.summary = event.get("summary", "")
+        self.description = event.get("description", "") or ""
+        start = event.get("start", {})
+        end = event.get("end", {})
+        self.all_day = "date" in start
+        self.start = start.get("dateTime")
+        self.end = end.get("dateTime")
+
+        self.organizer_email = event.get("organizer", {}).get("email", "").lower()
+        attendees = event.get("attendees", [])
+        self.attendee_emails = tuple(att.get("email", "").lower() for att in attendees)
+        self.attendee_domains = tuple(email.split("@")[-1] for email in self.attendee_emails)
+
+        self_email = self_email.lower() if self_email else None
+        self.self_email = self_email
+        self.other_emails = tuple(email for email in self.attendee_emails if email != self_email)
+        self.is_organizer = self_email is not None and self.organizer_email == self_email
+        self.self_status = None
+        if self_email is not None:
+            for att, email in zip(attendees, self.attendee_emails):
+                if email == self_email:
+                    self.self_status = att.get("responseStatus")
+                    break
+
+        # For an externally organized event, the first attendee outside the
+        # internal domain is the external actor whose domain picks the project
+        self.external_organizer = not self.organizer_email.endswith(internal_domain)
+        self.external_actor_email = None
+        if self.external_organizer:
+            self.external_actor_email = next(
+                (email for email in self.attendee_emails if email and not email.endswith(internal_domain)), None
+            )
+
+        self.reclaim_task = "reclaim.ai" in self.description
+        self.noproject = "#noproject" in self.description.lower()
+
+    @property
+    def title(self):
+        """Summary for messages and Clockify descriptions."""
+        return self.event.get("summary", "No title")
+
+    def skip_reason(self, ignored_emails):
+        """
+        Run the filter chain in one pass. Returns the SkipReason of the first
+        filter that rejects the event, or None if it should be logged.
+        """
+        if self.reclaim_task:
+            return SkipReason.RECLAIM_TASK
+        if self.all_day:
+            return SkipReason.ALL_DAY
+        if self.noproject:
+            return SkipReason.NOPROJECT_TAG
+        if not self.attendee_emails:
+            return SkipReason.NO_INVITEES
+        if len(self.other_emails) == 1 and self.other_emails[0] in ignored_emails:
+            return SkipReason.IGNORED_ATTENDEE_ONLY
+        if self.external_organizer and self.external_actor_email is None:
+            return SkipReason.EXTERNAL_WITHOUT_PARTICIPANT
+        # Only process if organizer or accepted attendee
+        if self.self_email and not self.is_organizer and self.self_status != "accepted":
+            return SkipReason.NOT_ACCEPTED
+        return None
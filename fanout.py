@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from calendar_client import CalendarClient, load_credentials, split_calendar_ids
+from config import ConfigError, build_clockify_client, build_metadata_cache, load_ignored_attendees, load_rules
+from metadata_cache import key_fingerprint
+from processing import TAG_CALENDAR_BOT, sync_range
+from run_log import SUMMARY, log
+from write_pipeline import WritePipeline
+
+PROFILE_KEYS = {
+    "name", "calendar_id", "clockify_api_key", "clockify_api_key_env", "workspace_id",
+    "self_email", "rules", "ignored_attendees", "google_credentials_file"
+}
+
+
+def load_profiles(path, config):
+    """
+    Read a profiles file: either a list of profiles or a mapping with
+    optional "defaults" and a "profiles" list. Returns fully resolved
+    profile dicts; environment settings fill in missing values.
+    """
+    try:
+        with open(path, "r") as f:
+            data = yaml.safe_load(f)
+    except Exception as e:
+        raise ConfigError(f"[ERROR] Failed to load {path}: {e}")
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get("defaults") or {}
+        data = data.get("profiles")
+    if not isinstance(data, list) or not data:
+        raise ConfigError(f"[ERROR] {path} must contain a non-empty list of profiles.")
+
+    profiles = []
+    for i, raw in enumerate(data):
+        if not isinstance(raw, dict):
+            raise ConfigError(f"[ERROR] Profile #{i + 1} in {path} must be a mapping.")
+        profile = {
+            "google_credentials_file": config["GOOGLE_CREDENTIALS_FILE"],
+            "workspace_id": config["CLOCKIFY_WORKSPACE_ID"],
+            "rules": "rules.yaml",
+            "ignored_attendees": "ignored_attendees.yaml"
+        }
+        profile.update(defaults)
+        profile.update(raw)
+        unknown = set(profile) - PROFILE_KEYS
+        if unknown:
+            raise ConfigError(f"[ERROR] Unknown keys in profile #{i + 1}: {', '.join(sorted(unknown))}")
+        if profile.get("calendar_id"):
+            # A profile may read several calendars, as a list or comma-separated
+            profile["calendar_id"] = ",".join(split_calendar_ids(profile["calendar_id"]))
+        name = profile.setdefault("name", profile.get("calendar_id") or f"profile-{i + 1}")
+        if profile.get("clockify_api_key_env"):
+            profile["clockify_api_key"] = os.getenv(profile["clockify_api_key_env"])
+        for key in ("calendar_id", "clockify_api_key", "workspace_id", "google_credentials_file"):
+            if not profile.get(key):
+                raise ConfigError(f"[ERROR] Profile '{name}' is missing '{key}'.")
+        if not os.path.exists(profile["google_credentials_file"]):
+            raise ConfigError(f"[ERROR] Credentials file '{profile['google_credentials_file']}' of profile '{name}' does not exist.")
+        profiles.append(profile)
+    return profiles
+
+
+class ProfileResult:
+    def __init__(self, name):
+        self.name = name
+        self.error = None
+        self.writes_succeeded = 0
+        self.writes_failed = 0
+        self.elapsed = 0.0
+
+
+class FanOutRunner:
+    """
+    Syncs several profiles concurrently. Everything that can be shared is
+    built once: rules and attendee files are parsed once per path, Google
+    credentials once per file, and Clockify clients once per (API key,
+    workspace), with one metadata cache per workspace. Calendar services
+    are built per profile because they are not thread-safe.
+    """
+    def __init__(self, profiles, config, args):
+        self.profiles = profiles
+        self.config = config
+        self.args = args
+        self._rules = {}
+        self._ignored = {}
+        self._credentials = {}
+        self._metadata = {}
+        self._clockify = {}
+        self._credentials_lock = threading.Lock()
+        # Parse every config file and build the Clockify clients up front so
+        # configuration errors surface before any profile starts.
+        for profile in profiles:
+            self._load_files(profile)
+            self._clockify_client(profile)
+
+    def _load_files(self, profile):
+        if profile["rules"] not in self._rules:
+            self._rules[profile["rules"]] = load_rules(profile["rules"])
+        if profile["ignored_attendees"] not in self._ignored:
+            self._ignored[profile["ignored_attendees"]] = load_ignored_attendees(profile["ignored_attendees"])
+
+    def _clockify_client(self, profile):
+        workspace_id = profile["workspace_id"]
+        key = (key_fingerprint(profile["clockify_api_key"]), workspace_id)
+        if key not in self._clockify:
+            if workspace_id not in self._metadata:
+                self._metadata[workspace_id] = build_metadata_cache(self.config, workspace_id)
+            self._clockify[key] = build_clockify_client(
+                self.config, profile["clockify_api_key"], workspace_id, self.args.concurrency,
+                metadata=self._metadata[workspace_id]
+            )
+        return self._clockify[key]
+
+    def _calendar_client(self, profile):
+        path = profile["google_credentials_file"]
+        with self._credentials_lock:
+            if path not in self._credentials:
+                self._credentials[path] = load_credentials(path)
+            creds = self._credentials[path]
+        return CalendarClient(path, profile["calendar_id"], credentials=creds,
+                              api_endpoint=self.config["GOOGLE_CALENDAR_API_URL"])
+
+    def _profile_config(self, profile):
+        ignored_emails, self_email = self._ignored[profile["ignored_attendees"]]
+        return {
+            "rules": self._rules[profile["rules"]],
+            "ignored_emails": ignored_emails,
+            "self_email": profile.get("self_email") or self_email
+        }
+
+    def run_profile(self, profile, start_date, end_date):
+        result = ProfileResult(profile["name"])
+        started = time.monotonic()
+        writer = WritePipeline(self.args.concurrency)
+        try:
+            clockify = self._clockify_client(profile)
+            calendar = self._calendar_client(profile)
+            if not self.args.simulate:
+                clockify.ensure_tag(TAG_CALENDAR_BOT)
+            sync_range(calendar, clockify, self._profile_config(profile), self.args, start_date, end_date, writer)
+        except Exception as e:
+            # One profile failing must not stop the others
+            result.error = e
+        finally:
+            writer.close()
+            result.elapsed = time.monotonic() - started
+        result.writes_succeeded = len(writer.succeeded)
+        result.writes_failed = len(writer.failed)
+        for label, error in writer.failed:
+            log.error("[%s] %s failed: %s", profile["name"], label, error)
+        return result
+
+    def run(self, start_date, end_date, workers):
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(self.run_profile, p, start_date, end_date) for p in self.profiles]
+            return [future.result() for future in futures]
+
+    def api_stats(self):
+        totals = {"requests": 0, "retries": 0, "throttled": 0}
+        for client in self._clockify.values():
+            for key in totals:
+                totals[key] += client.stats[key]
+        return totals
+
+
+def print_report(results, wall_time, api_stats):
+    lines = [
+        "Fan-out report",
+        f"{'Profile':30} | {'Status':8} | {'Writes':>6} | {'Failed':>6} | Time",
+        "-" * 70
+    ]
+    for r in results:
+        status = "failed" if r.error else "ok"
+        lines.append(f"{r.name[:30]:30} | {status:8} | {r.writes_succeeded:6} | {r.writes_failed:6} | {r.elapsed:.1f}s")
+    log.info("\n".join(lines), extra=SUMMARY)
+    for r in results:
+        if r.error:
+            log.error("Profile '%s' failed: %s", r.name, r.error)
+    ok = sum(1 for r in results if not r.error)
+    slowest = max((r.elapsed for r in results), default=0)
+    log.info("%d/%d profiles succeeded in %.1fs (slowest profile %.1fs, sum %.1fs)", ok, len(results), wall_time,
+             slowest, sum(r.elapsed for r in results), extra=SUMMARY)
+    log.info("Clockify API: %d requests, %d retries, %d throttled (429)", api_stats["requests"],
+             api_stats["retries"], api_stats["throttled"], extra=SUMMARY)
@@ -0,0 +1,134 @@
+from calendar_client import SyncTokenExpired
+from metrics import METRICS
+from processing import TAG_CALENDAR_BOT, fetch_entry_index, resolve_overlap, select_project
+from run_log import event_fields, log
+from time_entry_index import DUPLICATE, normalize_timestamp
+
+
+def _create_entry(clockify, state, calendar_id, event_id, start, end, summary, project_id):
+    entry = clockify.create_time_entry(start, end, summary, project_id, tags=[TAG_CALENDAR_BOT])
+    state.mark_processed(calendar_id, event_id, entry["id"])
+    return entry
+
+
+def _update_entry(clockify, state, calendar_id, event_id, entry_id, start, end, summary, project_id):
+    entry = clockify.update_time_entry(entry_id, start, end, summary, project_id)
+    state.mark_processed(calendar_id, event_id, entry_id)
+    return entry
+
+
+def _delete_entry(clockify, state, calendar_id, event_id, entry_id):
+    if not clockify.delete_time_entry(entry_id, missing_ok=True):
+        log.info("Entry %s was already deleted in Clockify", entry_id)
+    state.mark_processed(calendar_id, event_id, None)
+
+
+def fetch_changes(calendar, state, time_min):
+    """
+    Pull the events changed since the stored sync token into the state store.
+    Returns (changed, unchanged, next_sync_token).
+    """
+    calendar_id = calendar.calendar_id
+    token = state.get_sync_token(calendar_id)
+    with METRICS.phase("calendar_fetch"):
+        try:
+            events, next_token = calendar.list_changes(token, time_min=time_min)
+        except SyncTokenExpired:
+            log.info("Sync token expired; running a full sync from the start date")
+            events, next_token = calendar.list_changes(None, time_min=time_min)
+
+    changed = unchanged = 0
+    for event in events:
+        if state.record_change(calendar_id, event):
+            changed += 1
+        else:
+            unchanged += 1
+            METRICS.inc("skipped_events", reason="unchanged")
+    state.commit()
+    return changed, unchanged, next_token
+
+
+def run_incremental(calendar, clockify, state, config, args, range_start, range_end, writer, entry_index=None):
+    """
+    Apply only the calendar changes since the last run: create entries for new
+    events in the range, patch entries of moved or edited events and delete
+    entries of cancelled events (or events that no longer qualify).
+    range_start and range_end are ISO strings.
+    """
+    calendar_id = calendar.calendar_id
+    changed, unchanged, next_token = fetch_changes(calendar, state, range_start)
+    log.info("Incremental sync: %d changed events, %d unchanged skipped", changed, unchanged)
+
+    bot_tag_id = clockify.get_tag_id(TAG_CALENDAR_BOT)
+    pending = list(state.pending_events(
+        calendar_id, normalize_timestamp(range_start), normalize_timestamp(range_end)
+    ))
+    for event, entry_id in pending:
+        event_id = event["id"]
+        summary = event.get("summary", "No title")
+
+        selected = None
+        if event.get("status") != "cancelled":
+            selected = select_project(event, clockify, config["rules"], config["ignored_emails"], config["self_email"])
+
+        if selected is None:
+            if args.simulate:
+                if entry_id:
+                    log.info("[SIMULATION] Would delete entry for: %s", summary, extra=event_fields(event))
+            elif entry_id is None:
+                state.mark_processed(calendar_id, event_id, None)
+            else:
+                log.info("Deleting entry for cancelled or no longer matching event: %s", summary,
+                         extra=event_fields(event))
+                writer.submit(f"Delete entry for '{summary}' ({entry_id})", _delete_entry,
+                              clockify, state, calendar_id, event_id, entry_id)
+            continue
+
+        project_id, project_name = selected
+        start = event["start"]["dateTime"]
+        end = event["end"]["dateTime"]
+        if args.simulate:
+            action = "update" if entry_id else "log"
+            log.info("[SIMULATION] Would %s: %s from %s to %s -> Project Name: %s", action, summary, start, end,
+                     project_name, extra=event_fields(event, project=project_name))
+            continue
+        if entry_id:
+            log.info("Updating: %s from %s to %s -> Project: %s", summary, start, end, project_id,
+                     extra=event_fields(event, project=project_name))
+            writer.submit(f"Update '{summary}' ({entry_id})", _update_entry,
+                          clockify, state, calendar_id, event_id, entry_id, start, end, summary, project_id)
+            continue
+
+        # Only new events need a duplicate check; it stays a per-event lookup
+        # so the run's Clockify traffic scales with the number of changes.
+        index = entry_index
+        if index is None:
+            index = fetch_entry_index(clockify, start, end)
+        status, existing = index.lookup(start, end, project_id)
+        if status == DUPLICATE and existing and bot_tag_id in existing.get("tagIds", []):
+            # Logged by an earlier full sync or backfill: adopt that entry, so moving or
+            # cancelling the event later updates or deletes it instead of leaving it behind.
+            # Entries without the bot tag are the user's own and are never adopted.
+            log.info("Linking '%s' at %s to its existing entry %s", summary, start, existing["id"],
+                     extra=event_fields(event, project=project_name))
+            state.mark_processed(calendar_id, event_id, existing["id"])
+            continue
+        interval = resolve_overlap(index, event, start, end, project_id, args.overlap_policy)
+        if interval is None:
+            state.mark_processed(calendar_id, event_id, None)
+            continue
+        start, end = interval
+        index.add(start, end, project_id)
+        log.info("Logging: %s from %s to %s -> Project: %s", summary, start, end, project_id,
+                 extra=event_fields(event, project=project_name))
+        writer.submit(f"Create '{summary}' at {start}", _create_entry,
+                      clockify, state, calendar_id, event_id, start, end, summary, project_id)
+
+    writer.wait()
+    if args.simulate:
+        return
+    # Events whose write failed stay unprocessed in the store and are retried
+    # on the next run, so the token can always advance.
+    state.commit()
+    if next_token:
+        state.set_sync_token(calendar_id, next_token)
@@ -1,41 +1,107 @@
 import os
-import yaml
 import argparse
 import sys
-import tkinter as tk
-from tkinter import ttk
-from tkinter import messagebox
-from tkcalendar import DateEntry
-from types import SimpleNamespace
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from calendar_client import CalendarClient
-from clockify_client import ClockifyClient
-from matcher import match_project
-from ui_dialog import get_parameters_via_dialog
+from backfill import CheckpointError, run_backfill
+from calendar_client import CalendarClient, split_calendar_ids
+from config import (
+    ConfigError, build_clockify_client, load_clockify_settings, load_ignored_attendees, load_rules, read_env
+)
+from daemon import DEFAULT_WORK_HOURS, ConfigWatcher, Daemon, Schedule, parse_work_hours
+from entry_store import store_path
+from fanout import FanOutRunner, load_profiles, print_report
+from metadata_cache import DEFAULT_CACHE_DIR
+from metrics import METRICS
+from plan import PlanError, apply_plan, load_plan, log_plan, make_purge_plan, make_sync_plan, save_plan
+from processing import TAG_CALENDAR_BOT, format_skipped, sync_range
+from report import GROUP_BY, run_report
+from run_log import DEFAULT_MAX_BYTES, LOG_FILE, SUMMARY, log, setup_logging, shutdown_logging
+from purge import purge_bot_entries
+from time_entry_index import normalize_timestamp
+from write_pipeline import WritePipeline
 
-TAG_CALENDAR_BOT = "calendar-bot"
-
-class ConfigError(Exception):
-    pass
+# GUI modules (tkinter, tkcalendar, ui_dialog) and the Google API client are
+# imported only on the code paths that need them, keeping headless starts fast.
 
 def parse_args():
-    import argparse
-    from datetime import datetime, timezone
     parser = argparse.ArgumentParser()
-    parser.add_argument("--start", type=str, required=True, help="Start date (YYYY-MM-DD)")
-    parser.add_argument("--end", type=str, required=True, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--start", type=str, help="Start date (YYYY-MM-DD), required unless --apply is given")
+    parser.add_argument("--end", type=str, help="End date (YYYY-MM-DD), required unless --apply is given")
     parser.add_argument("--simulate", action="store_true")
     parser.add_argument("--purge", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of Clockify writes to run in parallel")
+    parser.add_argument("--incremental", action="store_true", help="Only sync calendar changes since the last incremental run")
+    parser.add_argument("--state", type=str, default="sync_state.sqlite", help="SQLite state file used by --incremental")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-download cached Clockify projects and tags")
+    parser.add_argument("--backfill", action="store_true", help="Sync a range of any length in windows, with a checkpoint")
+    parser.add_argument("--window-days", type=int, default=7, help="Days per --backfill window")
+    parser.add_argument("--checkpoint", type=str, default="backfill_checkpoint.json", help="Checkpoint file used by --backfill")
+    parser.add_argument("--resume", action="store_true", help="Continue a --backfill after its last completed window")
+    parser.add_argument("--profiles", type=str, help="YAML file of calendar/Clockify profiles to sync concurrently")
+    parser.add_argument("--workers", type=int, default=4, help="Number of --profiles synced in parallel")
+    parser.add_argument("--overlap-policy", choices=("skip", "trim", "log"), default="skip",
+                        help="What to do with events that overlap existing Clockify entries")
+    parser.add_argument("--quiet", action="store_true", help="Only print run summaries and errors")
+    parser.add_argument("--log-file", type=str, default=LOG_FILE, help="File that warnings and errors are appended to")
+    parser.add_argument("--log-jsonl", type=str, help="Also write every log line as JSON (event ID, date, skip reason, project) to this file")
+    parser.add_argument("--log-max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="Rotate log files at this size (0 disables rotation)")
+    parser.add_argument("--plan", type=str, help="Compute the creates, skips and deletes of the run without writing, and save them to this file")
+    parser.add_argument("--apply", type=str, help="Execute a plan file written by --plan (refused if the plan is stale)")
+    parser.add_argument("--report", action="store_true", help="Print the hours logged in the range instead of syncing")
+    parser.add_argument("--group-by", choices=GROUP_BY, default="project", help="How --report groups hours")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and re-sync the last days on a schedule")
+    parser.add_argument("--interval", type=float, default=5, help="Minutes between --daemon syncs during working hours")
+    parser.add_argument("--idle-interval", type=float, default=60, help="Minutes between --daemon syncs at night and on weekends")
+    parser.add_argument("--work-hours", type=str, default=DEFAULT_WORK_HOURS, help="Local working hours for --daemon, e.g. 8-19")
+    parser.add_argument("--lookback-days", type=int, default=0, help="Days before today each --daemon sync covers")
+    parser.add_argument("--metrics", type=str, help="Write run metrics to this file (.prom for a Prometheus textfile, otherwise JSON)")
+    parser.set_defaults(gui=False)
     # Only show dialog if no parameters are provided (other than script name)
     if len(sys.argv) == 1:
-        args = get_parameters_via_dialog()
-        if args is None:
+        from ui_dialog import get_parameters_via_dialog
+        result = get_parameters_via_dialog()
+        if result is None:
             print("[INFO] User cancelled parameter input dialog.")
             sys.exit(0)
+        # Options the dialog doesn't ask for keep their command-line defaults
+        args = parser.parse_args(["--start", result.start, "--end", result.end])
+        vars(args).update(vars(result))
+        args.gui = True  # Run with the progress window
         return args
     else:
         args = parser.parse_args()
+        if args.apply:
+            if (args.plan or args.simulate or args.incremental or args.backfill or args.profiles or args.purge
+                    or args.report or args.daemon):
+                raise ConfigError("[ERROR] --apply takes its range and actions from the plan; it cannot be combined "
+                                  "with --plan, --simulate, --purge, --report, --daemon, --incremental, --backfill "
+                                  "or --profiles.")
+            if args.concurrency < 1:
+                raise ConfigError("[ERROR] --concurrency must be at least 1.")
+            return args
+        if args.daemon:
+            if args.plan or args.purge or args.report or args.backfill or args.profiles:
+                raise ConfigError("[ERROR] --daemon cannot be combined with --plan, --purge, --report, --backfill "
+                                  "or --profiles.")
+            if args.start or args.end:
+                raise ConfigError("[ERROR] --daemon syncs today (plus --lookback-days); it takes no --start or --end.")
+            if args.interval <= 0 or args.idle_interval <= 0:
+                raise ConfigError("[ERROR] --interval and --idle-interval must be positive.")
+            if args.lookback_days < 0:
+                raise ConfigError("[ERROR] --lookback-days cannot be negative.")
+            if args.concurrency < 1:
+                raise ConfigError("[ERROR] --concurrency must be at least 1.")
+            parse_work_hours(args.work_hours)
+            return args
+        if not args.start or not args.end:
+            raise ConfigError("[ERROR] --start and --end are required.")
+        if args.plan and (args.simulate or args.incremental or args.backfill or args.profiles):
+            raise ConfigError("[ERROR] --plan cannot be combined with --simulate, --incremental, --backfill or --profiles.")
+        if args.report and (args.plan or args.simulate or args.purge or args.incremental or args.backfill or args.profiles):
+            raise ConfigError("[ERROR] --report cannot be combined with --plan, --simulate, --purge, --incremental, "
+                              "--backfill or --profiles.")
         # Validate date format and logic
         try:
             start_date = datetime.strptime(args.start, "%Y-%m-%d").replace(tzinfo=timezone.utc)
@@ -44,57 +110,52 @@ def parse_args():
             raise ConfigError("[ERROR] Start and end dates must be in YYYY-MM-DD format.")
         if start_date > end_date:
             raise ConfigError("[ERROR] Start date cannot be after end date.")
-        if (end_date - start_date).days > 31:
-            raise ConfigError("[ERROR] Date range cannot exceed 31 days.")
+        if (end_date - start_date).days > 31 and not (args.backfill or args.report):
+            raise ConfigError("[ERROR] Date range cannot exceed 31 days. Use --backfill for longer ranges.")
+        if args.concurrency < 1:
+            raise ConfigError("[ERROR] --concurrency must be at least 1.")
+        if args.window_days < 1:
+            raise ConfigError("[ERROR] --window-days must be at least 1.")
+        if args.resume and not args.backfill:
+            raise ConfigError("[ERROR] --resume only applies to --backfill.")
+        if args.backfill and (args.incremental or args.purge):
+            # A purge deletes its range in one pass; it has no windows or checkpoint to resume
+            raise ConfigError("[ERROR] --backfill cannot be combined with --incremental or --purge.")
+        if args.profiles and (args.purge or args.incremental or args.backfill):
+            raise ConfigError("[ERROR] --profiles cannot be combined with --purge, --incremental or --backfill.")
+        if args.workers < 1:
+            raise ConfigError("[ERROR] --workers must be at least 1.")
+        if args.log_max_bytes < 0:
+            raise ConfigError("[ERROR] --log-max-bytes cannot be negative.")
         return args
 
-def load_config():
+def load_config(profiles=False):
+    """
+    Load rules, ignored attendees and environment settings. With profiles=True
+    (the --profiles runner) each profile brings its own calendar, key, rules
+    and attendees, so those are only read here as optional defaults.
+    """
     load_dotenv()
-    # Validate rules.yaml
-    if not os.path.exists("rules.yaml"):
-        raise ConfigError("[ERROR] rules.yaml file is missing. Please provide a rules.yaml file.")
-    try:
-        with open("rules.yaml", "r") as f:
-            rules = yaml.safe_load(f)
-    except Exception as e:
-        raise ConfigError(f"[ERROR] Failed to load rules.yaml: {e}")
-    if not rules or not isinstance(rules, dict):
-        raise ConfigError("[ERROR] rules.yaml is empty or not a valid mapping. Please check its contents.")
-
-    ignored_emails = set()
-    self_email = None
-    if os.path.exists("ignored_attendees.yaml"):
-        try:
-            with open("ignored_attendees.yaml", "r") as f:
-                data = yaml.safe_load(f)
-        except Exception as e:
-            raise ConfigError(f"[ERROR] Failed to load ignored_attendees.yaml: {e}")
-        if not isinstance(data, dict):
-            raise ConfigError("[ERROR] ignored_attendees.yaml must be a mapping with 'ignored_emails' and 'self_email'.")
-        ignored_emails = set(data.get("ignored_emails", []))
-        self_email = data.get("self_email")
-        if not isinstance(ignored_emails, set) or not all(isinstance(e, str) for e in ignored_emails):
-            raise ConfigError("[ERROR] 'ignored_emails' in ignored_attendees.yaml must be a list of strings.")
-        if self_email is not None and not isinstance(self_email, str):
-            raise ConfigError("[ERROR] 'self_email' in ignored_attendees.yaml must be a string.")
+    single = not profiles
+    # A custom Calendar endpoint (e.g. a local fake server) can run without credentials
+    needs_credentials = single and not os.getenv("GOOGLE_CALENDAR_API_URL")
 
     # Validate environment variables
     env_vars = [
-        ("GOOGLE_CREDENTIALS_FILE", "Path to Google service account credentials JSON file (set GOOGLE_CREDENTIALS_FILE)", True),
-        ("GOOGLE_CALENDAR_ID", "Google Calendar ID (set GOOGLE_CALENDAR_ID)", True),
-        ("CLOCKIFY_API_KEY", "Clockify API key (set CLOCKIFY_API_KEY)", True),
-        ("CLOCKIFY_WORKSPACE_ID", "Clockify workspace ID (set CLOCKIFY_WORKSPACE_ID)", True)
+        ("GOOGLE_CREDENTIALS_FILE", "Path to Google service account credentials JSON file (set GOOGLE_CREDENTIALS_FILE)", needs_credentials),
+        ("GOOGLE_CALENDAR_ID", "Google Calendar ID, or several separated by commas (set GOOGLE_CALENDAR_ID)", single),
+        ("GOOGLE_CALENDAR_API_URL", "Google Calendar API base URL, e.g. a local fake server (set GOOGLE_CALENDAR_API_URL)", False)
     ]
-    config = {}
-    for var, hint, required in env_vars:
-        value = os.getenv(var)
-        if required and not value:
-            raise ConfigError(f"[ERROR] Missing environment variable: {var}. Hint: {hint}")
-        config[var] = value
+    config = read_env(env_vars)
+    config.update(load_clockify_settings(required=single))
     # Check credentials file exists
-    if not os.path.exists(config["GOOGLE_CREDENTIALS_FILE"]):
+    if config["GOOGLE_CREDENTIALS_FILE"] and not os.path.exists(config["GOOGLE_CREDENTIALS_FILE"]):
         raise ConfigError(f"[ERROR] GOOGLE_CREDENTIALS_FILE '{config['GOOGLE_CREDENTIALS_FILE']}' does not exist.")
+    if profiles:
+        return config
 
+    rules = load_rules("rules.yaml")
+    ignored_emails, self_email = load_ignored_attendees("ignored_attendees.yaml")
     config.update({
         "rules": rules,
         "ignored_emails": ignored_emails,
@@ -102,172 +163,244 @@ def load_config():
     })
     return config
 
-def is_reclaim_task(event):
-    return "reclaim.ai" in event.get("description", "")
-
-def is_all_day(event):
-    return "date" in event.get("start", {})
-
-def has_invitees(event):
-    return bool(event.get("attendees", []))
-
-def handle_external_organizer(event):
-    organizer_email = event.get("organizer", {}).get("email", "")
-    attendees = event.get("attendees", [])
-    if not organizer_email.endswith("wechange.company"):
-        matching_emails = [
-            att.get("email") for att in attendees
-            if att.get("email") and not att["email"].endswith("wechange.company")
-        ]
-        if matching_emails:
-            event["external_actor_email"] = matching_emails[0]
-            return True
-        return False
-    return True
+def finish_writes(writer):
+    writer.close()
+    log.info("Writes: %s", writer.summary(), extra=SUMMARY)
+    for label, error in writer.failed:
+        log.error("%s failed: %s", label, error)
 
-def is_noproject_tagged(event):
-    description = event.get("description", "")
-    return "#noproject" in description.lower()
+def print_api_stats(clockify, since=None):
+    """Log the client's request stats, or only those since an earlier stats_snapshot()."""
+    stats = clockify.stats_snapshot()
+    if since is not None:
+        stats = {key: value - since[key] for key, value in stats.items()}
+    log.info("Clockify API: %d requests, %d retries, %d throttled (429), %.1fs waiting on the rate limiter",
+             stats["requests"], stats["retries"], stats["throttled"], stats["throttle_wait"], extra=SUMMARY)
 
-def log_error(msg, path="unmatched_events.log"):
-    print(msg)
-    with open(path, "a") as f:
-        f.write(msg + "\n")
-        
-def is_ignored_attendee_only(event, ignored_emails, self_email):
-    attendees = event.get("attendees", [])
-    actual_attendees = [
-        att.get("email", "").lower()
-        for att in attendees
-        if att.get("email", "").lower() != self_email.lower()
-    ]
-    return len(actual_attendees) == 1 and actual_attendees[0] in ignored_emails
-
-def process_events(events, clockify, rules, ignored_emails, self_email, args):
-    for event in events:
-        summary = event.get("summary", "No title")
-        if is_reclaim_task(event):
-            print(f"Skipping Reclaim task: {summary}")
-            continue
-        if is_all_day(event):
-            print(f"Skipping all-day event: {summary}")
-            continue
-        if is_noproject_tagged(event):
-            print(f"Skipping event due to '#noproject' tag in description: {summary}")
-            continue
-        if not has_invitees(event):
-            print(f"Skipping event without invitees: {summary}")
-            continue
-        if is_ignored_attendee_only(event, ignored_emails, self_email):
-            print(f"Skipping 1-on-1 meeting with ignored attendee: {summary}")
-            continue
-        if not handle_external_organizer(event):
-            print(f"Skipping external event without valid participant: {summary}")
-            continue
-
-        # Only process if organizer or accepted attendee
-        organizer_email = event.get("organizer", {}).get("email", "").lower()
-        if self_email:
-            if organizer_email != self_email.lower():
-                attendees = event.get("attendees", [])
-                found = False
-                for att in attendees:
-                    if att.get("email", "").lower() == self_email.lower():
-                        if att.get("responseStatus") == "accepted":
-                            found = True
-                        break
-                if not found:
-                    print(f"Skipping event not accepted by self: {summary}")
-                    continue
-
-        start = event["start"]["dateTime"]
-        end = event["end"]["dateTime"]
-        project_name = match_project(event, rules)
-        project_id = clockify.resolve_project_name(project_name) if project_name else None
-
-        if project_name and not project_id:
-            log_error(f"[WARNING] No Clockify project found for name: '{project_name}' — will skip entry.")
-            continue
+def run_profiles(args, config):
+    start_date = datetime.strptime(args.start, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    end_date = datetime.strptime(args.end, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    try:
+        runner = FanOutRunner(load_profiles(args.profiles, config), config, args)
+    except ConfigError as e:
+        log.error("%s", str(e).replace("[ERROR] ", ""))
+        return
+    log.info("Syncing %d profiles with %d workers", len(runner.profiles), args.workers)
+    started = time.monotonic()
+    results = runner.run(start_date, end_date, args.workers)
+    print_report(results, time.monotonic() - started, runner.api_stats())
 
-        if args.simulate:
-            print(f"[SIMULATION] Would log: {summary} from {start} to {end} -> Proj. ID: {project_id}, Project Name: {project_name}")
-        else:
-            print(f"Logging: {summary} from {start} to {end} -> Project: {project_id}")
-            existing_entries = clockify.get_time_entries(start, end)
-            conflict_found = False
-            for entry in existing_entries:
-                entry_start = entry.get("timeInterval", {}).get("start")
-                entry_end = entry.get("timeInterval", {}).get("end")
-                entry_project_id = entry.get("projectId")
-                if entry_start == start and entry_end == end:
-                    if entry_project_id == project_id:
-                        print(f"Skipping duplicate entry for {summary} at {start}")
-                        conflict_found = True
-                        break
-                    else:
-                        log_error(f"[WARNING] Conflicting time entry exists at {start} for a different project!")
-                        conflict_found = True
-                        break
-            if conflict_found:
-                continue
-            clockify.create_time_entry(start, end, summary, project_id, tags=[TAG_CALENDAR_BOT])
-    
+def run_apply(args, config, clockify):
+    try:
+        plan = load_plan(args.apply)
+    except PlanError as e:
+        log.error("%s", str(e).replace("[ERROR] ", ""))
+        return
+    log.info("Applying plan %s for %s to %s", args.apply, plan["range_start"], plan["range_end"])
+    calendar = None
+    if plan["kind"] == "sync":
+        with METRICS.phase("client_construction"):
+            calendar = CalendarClient(config["GOOGLE_CREDENTIALS_FILE"], config["GOOGLE_CALENDAR_ID"],
+                                      api_endpoint=config["GOOGLE_CALENDAR_API_URL"])
+        if plan["creates"]:
+            clockify.ensure_tag(TAG_CALENDAR_BOT)  # Warm the tag cache before writes run in parallel
+    try:
+        writer = apply_plan(plan, calendar, clockify, config, args.concurrency)
+    except PlanError as e:
+        log.error("%s", str(e).replace("[ERROR] ", ""))
+        return
+    for label, error in writer.failed:
+        log.error("%s failed: %s", label, error)
+    print_api_stats(clockify)
 
+def save_and_log_plan(args, plan):
+    save_plan(args.plan, plan)
+    log_plan(plan)
+    log.info("Plan written to %s; run with --apply %s to execute it", args.plan, args.plan, extra=SUMMARY)
 
-def main():
-    try:
-        args = parse_args()
-        config = load_config()
-    except ConfigError as e:
-        print(e)
+def run(args, config):
+    if args.profiles:
+        run_profiles(args, config)
+        return
+    with METRICS.phase("client_construction"):
+        clockify = build_clockify_client(config, config["CLOCKIFY_API_KEY"], config["CLOCKIFY_WORKSPACE_ID"], args.concurrency)
+    if args.refresh_cache:
+        clockify.metadata.refresh(clockify)
+    if args.apply:
+        run_apply(args, config, clockify)
+        return
+    if args.daemon:
+        run_daemon(args, config, clockify)
         return
-    calendar = CalendarClient(config["GOOGLE_CREDENTIALS_FILE"], config["GOOGLE_CALENDAR_ID"])
-    clockify = ClockifyClient(config["CLOCKIFY_API_KEY"], config["CLOCKIFY_WORKSPACE_ID"])
 
     try:
         start_date = datetime.strptime(args.start, "%Y-%m-%d").replace(tzinfo=timezone.utc)
         end_date = datetime.strptime(args.end, "%Y-%m-%d").replace(tzinfo=timezone.utc)
     except ValueError:
-        print("[ERROR] Start and end dates must be in YYYY-MM-DD format.")
+        log.error("Start and end dates must be in YYYY-MM-DD format.")
         return
 
     if start_date > end_date:
-        print("[ERROR] Start date cannot be after end date.")
+        log.error("Start date cannot be after end date.")
         return
 
-    if (end_date - start_date).days > 31:
-        print("[ERROR] Date range cannot exceed 31 days.")
+    if (end_date - start_date).days > 31 and not (args.backfill or args.report):
+        log.error("Date range cannot exceed 31 days.")
         return
 
-    tag_map = clockify.get_tag_map()
-    calendar_bot_tag_id = next((tid for tid, name in tag_map.items() if name == TAG_CALENDAR_BOT), None)
+    range_start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    range_end = end_date.replace(hour=23, minute=59, second=59, microsecond=0)
+
+    if args.report:
+        workspace_id = config["CLOCKIFY_WORKSPACE_ID"]
+        run_report(clockify, store_path(workspace_id, config["CLOCKIFY_API_KEY"],
+                                        config["CLOCKIFY_CACHE_DIR"] or DEFAULT_CACHE_DIR),
+                   normalize_timestamp(range_start.isoformat()), normalize_timestamp(range_end.isoformat()),
+                   args.group_by, refresh=args.refresh_cache)
+        print_api_stats(clockify)
+        return
+
+    calendar_bot_tag_id = clockify.get_tag_id(TAG_CALENDAR_BOT)
 
     if args.purge and calendar_bot_tag_id is None:
-        print(f"[ERROR] Tag '{TAG_CALENDAR_BOT}' not found in Clockify. Cannot safely purge.")
+        log.error("Tag '%s' not found in Clockify. Cannot safely purge.", TAG_CALENDAR_BOT)
+        return
+
+    if args.purge and args.plan:
+        save_and_log_plan(args, make_purge_plan(
+            clockify, config, args, normalize_timestamp(range_start.isoformat()),
+            normalize_timestamp(range_end.isoformat()), calendar_bot_tag_id
+        ))
+        print_api_stats(clockify)
         return
 
-    current_day = start_date
-    while current_day <= end_date:
-        print(f"[INFO] Processing date: {current_day.date()}")
-        start_range = current_day.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_range = current_day.replace(hour=23, minute=59, second=59, microsecond=0)
-        events = calendar.get_events_in_range(start_range.isoformat(), end_range.isoformat())
+    if args.purge:
+        # Purging never needs calendar events: one range-wide fetch of the
+        # bot-tagged entries, then bulk deletes.
+        log.info("Purging entries tagged '%s' from %s to %s", TAG_CALENDAR_BOT, start_date.date(), end_date.date())
+        result = purge_bot_entries(
+            clockify, calendar_bot_tag_id,
+            normalize_timestamp(range_start.isoformat()), normalize_timestamp(range_end.isoformat()),
+            simulate=args.simulate, concurrency=args.concurrency
+        )
+        log.info("Purge finished: %s", result.summary(), extra=SUMMARY)
+        for label, error in result.failed:
+            log.error("%s failed: %s", label, error)
+        print_api_stats(clockify)
+        return
+
+    with METRICS.phase("client_construction"):
+        calendar = CalendarClient(config["GOOGLE_CREDENTIALS_FILE"], config["GOOGLE_CALENDAR_ID"],
+                                  api_endpoint=config["GOOGLE_CALENDAR_API_URL"])
+    if args.plan:
+        save_and_log_plan(args, make_sync_plan(
+            calendar, clockify, config, args, normalize_timestamp(range_start.isoformat()),
+            normalize_timestamp(range_end.isoformat())
+        ))
+        print_api_stats(clockify)
+        return
+    if not args.simulate:
+        clockify.ensure_tag(TAG_CALENDAR_BOT)  # Warm the tag cache before writes run in parallel
+
+    if args.backfill:
+        try:
+            run_backfill(calendar, clockify, config, args, start_date, end_date)
+        except CheckpointError as e:
+            log.error("%s", str(e).replace("[ERROR] ", ""))
+            return
+        print_api_stats(clockify)
+        return
+
+    state = None
+    if args.incremental:
+        from sync_state import SyncState
+        state = SyncState(args.state)
+    try:
+        sync_once(args, config, calendar, clockify, start_date, end_date, state)
+    finally:
+        if state is not None:
+            state.close()
+
+def sync_once(args, config, calendar, clockify, start_date, end_date, state=None, stats_since=None):
+    """
+    Sync start_date..end_date (UTC datetimes at midnight) once. With a
+    SyncState only the calendar changes since the last incremental run are
+    applied. stats_since limits the API stats reported to those after that
+    snapshot.
+    """
+    # Creates are independent, so they go through a bounded
+    # pool; ClockifyClient's rate limiter keeps the pool within API limits.
+    writer = WritePipeline(args.concurrency)
 
-        if args.purge:
-            print(f"[INFO] Purging entries tagged '{TAG_CALENDAR_BOT}' on {current_day.date()}")
-            entries_to_delete = clockify.get_time_entries(start_range.isoformat(), end_range.isoformat())
-            for entry in entries_to_delete:
-                tag_ids = entry.get("tagIds", [])
-                if calendar_bot_tag_id in tag_ids:
-                    entry_id = entry.get("id")
-                    desc = entry.get("description", "")
-                    print(f"  Deleting entry: {desc}")
-                    clockify.delete_time_entry(entry_id)
+    if state is not None:
+        from incremental import run_incremental
+        range_start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        range_end = end_date.replace(hour=23, minute=59, second=59, microsecond=0)
+        run_incremental(calendar, clockify, state, config, args,
+                        range_start.isoformat(), range_end.isoformat(), writer)
+    else:
+        skipped = sync_range(calendar, clockify, config, args, start_date, end_date, writer)
+        log.info("Skipped events: %s", format_skipped(skipped), extra=SUMMARY)
+    finish_writes(writer)
+    print_api_stats(clockify, stats_since)
+
+def run_daemon(args, config, clockify):
+    """
+    Sync today (and --lookback-days before it) on a schedule until SIGTERM,
+    reusing the same clients, token and caches for every cycle.
+    """
+    with METRICS.phase("client_construction"):
+        calendar = CalendarClient(config["GOOGLE_CREDENTIALS_FILE"], config["GOOGLE_CALENDAR_ID"],
+                                  api_endpoint=config["GOOGLE_CALENDAR_API_URL"])
+    if not args.simulate:
+        clockify.ensure_tag(TAG_CALENDAR_BOT)
+    state = None
+    if args.incremental:
+        from sync_state import SyncState
+        state = SyncState(args.state)
+
+    def cycle(start_date, end_date):
+        stats_before = clockify.stats_snapshot()
+        # The TTL is otherwise only checked when the cache file is read, once per process
+        clockify.metadata.refresh_if_stale(clockify)
+        sync_once(args, config, calendar, clockify, start_date, end_date, state, stats_before)
+        if args.metrics:
+            METRICS.write(args.metrics)  # Keep the textfile current between cycles
+
+    schedule = Schedule(args.interval * 60, args.idle_interval * 60, parse_work_hours(args.work_hours))
+    log.info("Daemon started: every %g min during working hours (%s), every %g min otherwise",
+             args.interval, args.work_hours, args.idle_interval, extra=SUMMARY)
+    try:
+        Daemon(cycle, schedule, ConfigWatcher(config), args.lookback_days).run()
+    finally:
+        if state is not None:
+            state.close()
+
+def main():
+    try:
+        with METRICS.phase("config_load"):
+            args = parse_args()
+            config = load_config(profiles=bool(args.profiles))
+            if args.incremental and len(split_calendar_ids(config["GOOGLE_CALENDAR_ID"] or "")) > 1:
+                raise ConfigError("[ERROR] --incremental keeps one sync token per calendar and supports a single "
+                                  "GOOGLE_CALENDAR_ID.")
+    except ConfigError as e:
+        print(e)
+        return
+    setup_logging(quiet=args.quiet, log_file=args.log_file, jsonl_file=args.log_jsonl, max_bytes=args.log_max_bytes)
+    try:
+        if args.gui:
+            from ui_dialog import run_with_progress
+            run_with_progress(lambda: run(args, config), args.start, args.end)
+        else:
+            run(args, config)
+    finally:
+        # Written even when the run fails, so a failing sync still leaves its timings
+        if args.metrics:
+            METRICS.write(args.metrics)
+            log.info("Metrics written to %s", args.metrics)
+        shutdown_logging()
 
-        process_events(events, clockify, config["rules"], config["ignored_emails"], config["self_email"], args)
-        print(f"[INFO] Finished processing date: {current_day.date()}\n")
-        current_day += timedelta(days=1)
-        
 
 if __name__ == "__main__":
     main()
@@ -1,29 +1,148 @@
 import re
+from event_record import EventRecord
+
+# "#proj" followed by whitespace, capturing everything after it as the project name
+PROJECT_HINT = re.compile(r"#proj\s+(.+)")
+
+RESERVED_KEYS = ("keywords", "patterns", "priority")
+DEFAULT_PRIORITY = ("hint", "external_actor", "attendee_domain", "keyword", "pattern")
+
+
+class DomainTrie:
+    """
+    Domain rules stored by reversed labels (com -> etoro -> eu), so a lookup
+    returns the rule of the longest matching suffix: a rule for etoro.com
+    also matches eu.etoro.com, but not notetoro.com.
+    """
+    def __init__(self):
+        self._root = {}
+
+    def add(self, domain, project):
+        node = self._root
+        for label in reversed(domain.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        node[None] = project  # None can never be a label, so it marks a rule
+
+    def lookup(self, domain):
+        node = self._root
+        project = None
+        for label in reversed(domain.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            project = node.get(None, project)
+        return project
+
+
+class RuleEngine:
+    """
+    rules.yaml compiled once for fast matching. Plain "domain: project"
+    entries become suffix rules in a DomainTrie. The optional "keywords" mapping
+    (case-insensitive whole words in the summary or description) becomes one
+    precompiled alternation. The optional "patterns" mapping (regexes on the
+    summary) is tried in file order. "priority" may reorder the stages.
+    """
+    def __init__(self, rules):
+        self.domains = DomainTrie()
+        for domain, project in rules.items():
+            if domain in RESERVED_KEYS:
+                continue
+            if not isinstance(project, str):
+                raise ValueError(f"Project for domain '{domain}' must be a string")
+            self.domains.add(str(domain), project)
+
+        keywords = rules.get("keywords") or {}
+        if not isinstance(keywords, dict):
+            raise ValueError("'keywords' must be a mapping of keyword to project name")
+        self._keywords = {str(k).casefold(): v for k, v in keywords.items()}
+        self._keyword_re = None
+        if self._keywords:
+            # Longest first, so "board meeting" wins over "board"
+            alternation = "|".join(re.escape(k) for k in sorted(self._keywords, key=len, reverse=True))
+            self._keyword_re = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
+
+        patterns = rules.get("patterns") or {}
+        if not isinstance(patterns, dict):
+            raise ValueError("'patterns' must be a mapping of regex to project name")
+        self._patterns = []
+        for pattern, project in patterns.items():
+            try:
+                self._patterns.append((re.compile(pattern), project))
+            except re.error as e:
+                raise ValueError(f"Invalid pattern '{pattern}': {e}")
+
+        self.priority = tuple(rules.get("priority") or DEFAULT_PRIORITY)
+        unknown = set(self.priority) - set(DEFAULT_PRIORITY)
+        if unknown:
+            raise ValueError(f"Unknown priority stages: {', '.join(sorted(unknown))}")
+        self._stages = [getattr(self, f"_match_{stage}") for stage in self.priority]
+
+    def _match_hint(self, record):
+        match = PROJECT_HINT.search(record.description)
+        return match.group(1).strip() if match else None
+
+    def _match_external_actor(self, record):
+        if record.external_actor_email:
+            return self.domains.lookup(record.external_actor_email.split("@")[-1])
+        return None
+
+    def _match_attendee_domain(self, record):
+        # An external actor's domain replaces the attendee scan
+        if record.external_actor_email:
+            return None
+        for domain in record.attendee_domains:
+            project = self.domains.lookup(domain)
+            if project:
+                return project
+        return None
+
+    def _match_keyword(self, record):
+        if self._keyword_re is None:
+            return None
+        for text in (record.summary, record.description):
+            match = self._keyword_re.search(text)
+            if match:
+                return self._keywords[match.group(0).casefold()]
+        return None
+
+    def _match_pattern(self, record):
+        for pattern, project in self._patterns:
+            if pattern.search(record.summary):
+                return project
+        return None
+
+    def match(self, event):
+        """
+        Return the project name for an EventRecord (or a raw event dict,
+        normalized here), or None.
+        """
+        record = event if isinstance(event, EventRecord) else EventRecord(event)
+        for stage in self._stages:
+            project = stage(record)
+            if project:
+                return project
+        # No match → default to None (for projectless entry)
+        return None
+
+    def match_many(self, events):
+        match = self.match
+        return [match(event) for event in events]
+
+
+def compile_rules(rules):
+    """
+    Return the RuleEngine for a rules mapping; an engine is returned as is.
+    Compiling isn't cached, so callers matching many events should compile
+    once and pass the engine around, as config.load_rules does.
+    """
+    if isinstance(rules, RuleEngine):
+        return rules
+    return RuleEngine(rules)
+
 
 def match_project(event, rules):
-    # Priority 1: Explicit project hint in description
-    description = event.get("description", "")
-    # This regex looks for "#proj" followed by whitespace and captures everything after it
-    # r"#proj\s+(.+)" means:
-    #   "#proj" - literal text "#proj"
-    #   "\s+" - one or more whitespace characters (spaces, tabs, etc.)
-    #   "(.+)" - capture group containing one or more of any character
-    match = re.search(r"#proj\s+(.+)", description)
-    if match:
-        return match.group(1).strip()
-
-    # Priority 2: Rules based on external actor's email
-    override_email = event.get("external_actor_email")
-    if override_email:
-        domain = override_email.split('@')[-1]
-        return rules.get(domain)
-
-    # Priority 3: Fallback to attendees’ domains
-    participants = [att.get('email', '') for att in event.get('attendees', [])]
-    for email in participants:
-        domain = email.split('@')[-1]
-        if domain in rules:
-            return rules[domain]
-
-    # No match → default to None (for projectless entry)
-    return None
+    return compile_rules(rules).match(event)
+
+
+def match_many(events, rules):
+    return compile_rules(rules).match_many(events)
@@ -0,0 +1,235 @@
+import hashlib
+import os
+import threading
+import time
+from atomic_file import atomic_write_json, read_json_cache
+
+DEFAULT_TTL = 24 * 60 * 60  # Seconds before cached metadata is re-downloaded
+MISS_REFRESH_INTERVAL = 60  # Minimum seconds between refreshes triggered by lookup misses
+CACHE_VERSION = 2  # 2: archived projects are cached too
+DEFAULT_CACHE_DIR = ".clockify_cache"
+
+
+def key_fingerprint(api_key):
+    """
+    Short, non-reversible identifier for an API key, used to cache user IDs
+    without writing the key to disk.
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_path(workspace_id, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, f"{workspace_id}.json")
+
+
+class MetadataCache:
+    """
+    Projects, tags and user IDs of one Clockify workspace, loaded once and
+    indexed by name and ID. When a path is given the data is persisted as JSON
+    and reused until it is older than ttl seconds; user IDs never change, so
+    they are kept whatever the file's age and fetched on their own. Lookups
+    that miss trigger a refresh, so newly created projects and tags are
+    picked up.
+
+    The cache can be shared by several ClockifyClients of the same workspace;
+    each lookup takes the client to fetch with if a download is needed.
+    Downloads run outside the data lock, so other threads keep reading the
+    cached data meanwhile, and one at a time, so concurrent misses don't
+    download the same data twice.
+    """
+    def __init__(self, workspace_id, path=None, ttl=DEFAULT_TTL):
+        self.workspace_id = workspace_id
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.RLock()  # Guards the data below
+        self._download_lock = threading.Lock()  # One projects/tags download at a time
+        self._tag_lock = threading.Lock()  # Held from tag lookup to creation
+        self._file_read = False
+        self._loaded = False
+        self._fetched_at = 0
+        self._last_miss_refresh = 0
+        self._projects = []
+        self._tags = []
+        self._users = {}
+
+    def _build_indexes(self):
+        self._project_by_name = {}
+        self._project_by_casefold = {}
+        self._project_name_by_id = {}
+        for project in self._projects:
+            self._project_name_by_id[project["id"]] = project["name"]
+            if project["archived"]:
+                continue  # Archived projects are listed, but never resolved for new entries
+            self._project_by_name.setdefault(project["name"], project["id"])
+            self._project_by_casefold.setdefault(project["name"].casefold(), project["id"])
+        self._tag_by_name = {}
+        for tag in self._tags:
+            self._tag_by_name.setdefault(tag["name"], tag["id"])
+
+    def _read(self):
+        """
+        Load the cache file, once: the user IDs whatever its age, and the
+        projects and tags if it is younger than ttl.
+        """
+        if self._file_read:
+            return
+        self._file_read = True
+        data = read_json_cache(self.path)
+        if data is None:
+            return
+        if data.get("version") != CACHE_VERSION or data.get("workspace_id") != self.workspace_id:
+            return
+        self._users = {**data.get("users", {}), **self._users}
+        if time.time() - data.get("fetched_at", 0) > self.ttl:
+            return
+        self._projects = data.get("projects", [])
+        self._tags = data.get("tags", [])
+        self._fetched_at = data["fetched_at"]
+        self._build_indexes()
+        self._loaded = True
+
+    def _write(self):
+        if not self.path:
+            return
+        data = {
+            "version": CACHE_VERSION,
+            "workspace_id": self.workspace_id,
+            "fetched_at": self._fetched_at,
+            "projects": self._projects,
+            "tags": self._tags,
+            "users": self._users
+        }
+        atomic_write_json(self.path, data)
+
+    def _ensure_loaded(self, client):
+        with self._lock:
+            self._read()
+            if self._loaded:
+                return
+        with self._download_lock:
+            if not self._loaded:  # Another thread may have downloaded while this one waited
+                self._download(client)
+
+    def _download(self, client):
+        """Fetch projects and tags and swap them in. Call with _download_lock held."""
+        projects = [
+            {"id": p["id"], "name": p["name"], "archived": p.get("archived", False),
+             "clientName": p.get("clientName", "")}
+            for p in client.get_projects(include_archived=True)
+        ]
+        tags = [{"id": t["id"], "name": t["name"]} for t in client.fetch_tags()]
+        with self._lock:
+            self._read()  # Keep the user IDs cached on disk
+            self._projects = projects
+            self._tags = tags
+            self._fetched_at = time.time()
+            # Data this fresh already answers a miss, so don't download it again for one
+            self._last_miss_refresh = time.monotonic()
+            self._build_indexes()
+            self._loaded = True
+            self._write()
+
+    def refresh(self, client):
+        """
+        Re-download projects and tags and rewrite the cache file.
+        """
+        with self._download_lock:
+            self._download(client)
+
+    def refresh_if_stale(self, client):
+        """
+        Re-download if the data held in memory is older than ttl, for
+        long-running processes. Returns True if it did.
+        """
+        with self._lock:
+            stale = self._loaded and time.time() - self._fetched_at > self.ttl
+        if stale:
+            self.refresh(client)
+        return stale
+
+    def _refresh_on_miss(self, client):
+        """
+        Refresh after a lookup miss, at most once per MISS_REFRESH_INTERVAL.
+        A miss waiting on another thread's refresh reuses it.
+        """
+        with self._download_lock:
+            if self._last_miss_refresh and time.monotonic() - self._last_miss_refresh < MISS_REFRESH_INTERVAL:
+                return
+            self._download(client)
+
+    def _lookup(self, client, find):
+        """find() under the data lock, retried once after a miss refresh if it returns None."""
+        self._ensure_loaded(client)
+        with self._lock:
+            found = find()
+        if found is None:
+            self._refresh_on_miss(client)
+            with self._lock:
+                found = find()
+        return found
+
+    def projects(self, client, include_archived=False):
+        self._ensure_loaded(client)
+        with self._lock:
+            return [p for p in self._projects if include_archived or not p["archived"]]
+
+    def _find_project(self, project_name):
+        project_id = self._project_by_name.get(project_name)
+        if project_id is None:
+            project_id = self._project_by_casefold.get(project_name.casefold())
+        return project_id
+
+    def project_id(self, client, project_name):
+        """
+        Resolve a project name to its ID: exact match first, then
+        case-insensitive. Returns None if the project doesn't exist.
+        """
+        return self._lookup(client, lambda: self._find_project(project_name))
+
+    def project_name(self, client, project_id):
+        return self._lookup(client, lambda: self._project_name_by_id.get(project_id))
+
+    def tag_id(self, client, tag_name):
+        return self._lookup(client, lambda: self._tag_by_name.get(tag_name))
+
+    def ensure_tag(self, client, tag_name, create):
+        """
+        Return the ID of tag_name, calling create() to make the tag if it
+        doesn't exist. A lock is held from lookup to create, so clients
+        sharing this cache (e.g. --profiles in one workspace) create it once.
+        """
+        with self._tag_lock:
+            tag_id = self.tag_id(client, tag_name)
+            if tag_id is None:
+                tag = create()
+                self.add_tag(tag)
+                tag_id = tag["id"]
+            return tag_id
+
+    def add_tag(self, tag):
+        with self._lock:
+            self._tags.append({"id": tag["id"], "name": tag["name"]})
+            self._tag_by_name.setdefault(tag["name"], tag["id"])
+            self._write()
+
+    def tag_map(self, client):
+        self._ensure_loaded(client)
+        with self._lock:
+            return {tag["id"]: tag["name"] for tag in self._tags}
+
+    def user_id(self, client):
+        """
+        The user ID of client's API key, fetched on its own rather than with
+        the projects and tags, so commands that only need it (--purge,
+        --report) don't download them.
+        """
+        fingerprint = key_fingerprint(client.api_key)
+        with self._lock:
+            self._read()
+            user_id = self._users.get(fingerprint)
+        if user_id is None:
+            user_id = client.fetch_user_id()
+            with self._lock:
+                self._users[fingerprint] = user_id
+                self._write()
+        return user_id
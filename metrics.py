@@ -0,0 +1,166 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from atomic_file import atomic_write
+
+# Upper bounds (seconds) of the API latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+PREFIX = "calendarbot"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics:
+    """
+    Run instrumentation: cumulative time per phase, per-endpoint API request
+    counts and latency histograms, and free-form counters (e.g. skip
+    reasons). Thread-safe, so writes on worker threads can record too.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.phases = {}
+            self.requests = {}
+            self.latency = {}
+            self.counters = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a block and add it to the phase's total. Phases entered from
+        several threads add up, so a total can exceed the wall-clock time.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            total, calls = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (total + seconds, calls + 1)
+
+    def observe_request(self, service, endpoint, status, seconds):
+        with self._lock:
+            key = (service, endpoint, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get((service, endpoint))
+            if histogram is None:
+                histogram = self.latency[(service, endpoint)] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            key = (name, tuple(sorted(labels.items())))
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "duration_seconds": time.time() - self.started,
+                "phases": {
+                    name: {"seconds": round(total, 6), "calls": calls}
+                    for name, (total, calls) in sorted(self.phases.items())
+                },
+                "requests": [
+                    {"service": service, "endpoint": endpoint, "status": status, "count": count}
+                    for (service, endpoint, status), count in sorted(self.requests.items())
+                ],
+                "latency": [
+                    {"service": service, "endpoint": endpoint, "count": h.count, "sum_seconds": round(h.sum, 6),
+                     "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in h.cumulative()}}
+                    for (service, endpoint), h in sorted(self.latency.items())
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ]
+            }
+
+    def to_prometheus(self):
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def labels(**values):
+            if not values:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in values.items()) + "}"
+
+        with self._lock:
+            header("run_start_timestamp_seconds", "gauge", "Unix time the run started")
+            lines.append(f"{PREFIX}_run_start_timestamp_seconds {self.started:.3f}")
+            header("run_duration_seconds", "gauge", "Wall-clock duration of the run")
+            lines.append(f"{PREFIX}_run_duration_seconds {time.time() - self.started:.6f}")
+            header("phase_seconds", "gauge", "Cumulative seconds spent per phase")
+            for name, (total, _) in sorted(self.phases.items()):
+                lines.append(f"{PREFIX}_phase_seconds{labels(phase=name)} {total:.6f}")
+            header("api_requests_total", "counter", "API requests by service, endpoint and status")
+            for (service, endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f"{PREFIX}_api_requests_total"
+                             f"{labels(service=service, endpoint=endpoint, status=status)} {count}")
+            header("api_request_duration_seconds", "histogram", "API request latency")
+            for (service, endpoint), h in sorted(self.latency.items()):
+                for bound, count in h.cumulative():
+                    le = "+Inf" if bound == float("inf") else str(bound)
+                    lines.append(f"{PREFIX}_api_request_duration_seconds_bucket"
+                                 f"{labels(service=service, endpoint=endpoint, le=le)} {count}")
+                lines.append(f"{PREFIX}_api_request_duration_seconds_sum"
+                             f"{labels(service=service, endpoint=endpoint)} {h.sum:.6f}")
+                lines.append(f"{PREFIX}_api_request_duration_seconds_count"
+                             f"{labels(service=service, endpoint=endpoint)} {h.count}")
+            previous = None
+            for (name, counter_labels), value in sorted(self.counters.items()):
+                if name != previous:
+                    header(f"{name}_total", "counter", f"Count of {name.replace('_', ' ')}")
+                    previous = name
+                lines.append(f"{PREFIX}_{name}_total{labels(**dict(counter_labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write a Prometheus textfile if path ends in .prom, otherwise JSON.
+        The file is replaced atomically so collectors never read half of it.
+        """
+        if path.endswith(".prom"):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), indent=2) + "\n"
+        atomic_write(path, content)
+
+
+# Process-wide metrics shared by the clients and the sync code
+METRICS = Metrics()
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from atomic_file import atomic_write_json, read_json
+from event_record import EventRecord, SkipReason
+from processing import TAG_CALENDAR_BOT, fetch_entries_around, resolve_overlap, select_project
+from purge import BULK_DELETE_BATCH_SIZE
+from run_log import SUMMARY, log
+from time_entry_index import TimeEntryIndex
+from write_pipeline import WritePipeline
+
+PLAN_VERSION = 1
+
+
+class PlanError(Exception):
+    pass
+
+
+def fingerprint(calendar_events, entries):
+    """
+    Hash of everything a plan was computed from: the calendar events and the
+    Clockify entries it was checked against. Any change makes a plan stale.
+    """
+    digest = hashlib.sha256()
+    for event in sorted(calendar_events, key=lambda e: e.get("id", "")):
+        digest.update(json.dumps(event, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    for entry in sorted(entries, key=lambda e: e["id"]):
+        digest.update(json.dumps(
+            [entry["id"], entry.get("timeInterval"), entry.get("projectId"), sorted(entry.get("tagIds") or [])]
+        ).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_state(plan, calendar, clockify):
+    """
+    Fetch what the plan depends on, with the same batched reads as when it
+    was made. Returns (calendar_events, entries).
+    """
+    if plan["kind"] == "purge":
+        tag_id = clockify.get_tag_id(TAG_CALENDAR_BOT)
+        entries = clockify.get_time_entries(plan["range_start"], plan["range_end"], tag_ids=[tag_id]) if tag_id else []
+        return [], [e for e in entries if tag_id in e.get("tagIds", [])]
+    events = calendar.get_events_in_range(plan["range_start"], plan["range_end"])
+    return events, fetch_entries_around(clockify, plan["range_start"], plan["range_end"])
+
+
+def _new_plan(kind, config, args, range_start, range_end):
+    return {
+        "version": PLAN_VERSION,
+        "kind": kind,
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "calendar_id": config["GOOGLE_CALENDAR_ID"],
+        "workspace_id": config["CLOCKIFY_WORKSPACE_ID"],
+        "range_start": range_start,
+        "range_end": range_end,
+        "overlap_policy": args.overlap_policy,
+        "creates": [],
+        "deletes": [],
+        "skipped": [],
+        "fingerprint": None
+    }
+
+
+def make_sync_plan(calendar, clockify, config, args, range_start, range_end):
+    """
+    Decide what a sync of range_start..range_end (ISO strings) would do,
+    without writing: one calendar fetch and one entry fetch, then the same
+    filter, matching and duplicate/overlap checks as a real run.
+    """
+    plan = _new_plan("sync", config, args, range_start, range_end)
+    events = calendar.get_events_in_range(range_start, range_end)
+    entries = fetch_entries_around(clockify, range_start, range_end)
+    index = TimeEntryIndex(entries)
+
+    for event in events:
+        record = EventRecord(event, config["self_email"])
+        outcome = Counter()
+        selected = select_project(record, clockify, config["rules"], config["ignored_emails"],
+                                  config["self_email"], outcome)
+        interval = None
+        if selected is not None:
+            interval = resolve_overlap(index, event, record.start, record.end, selected[0],
+                                       args.overlap_policy, outcome)
+        if interval is None:
+            reason = next(iter(outcome))
+            plan["skipped"].append({
+                "event_id": event.get("id"),
+                "summary": record.title,
+                "start": record.start,
+                "reason": reason.value,
+                "project": selected[1] if selected else None
+            })
+            continue
+        project_id, project_name = selected
+        plan["creates"].append({
+            "event_id": event.get("id"),
+            "description": record.title,
+            "start": interval[0],
+            "end": interval[1],
+            "project_id": project_id,
+            "project": project_name
+        })
+        # Later events must see this entry, as in a real run
+        index.add(interval[0], interval[1], project_id)
+
+    plan["fingerprint"] = fingerprint(events, entries)
+    return plan
+
+
+def make_purge_plan(clockify, config, args, range_start, range_end, tag_id):
+    """
+    List the bot-tagged entries a purge of the range would delete.
+    """
+    plan = _new_plan("purge", config, args, range_start, range_end)
+    entries = clockify.get_time_entries(range_start, range_end, tag_ids=[tag_id])
+    entries = [e for e in entries if tag_id in e.get("tagIds", [])]
+    plan["deletes"] = [
+        {"entry_id": e["id"], "description": e.get("description", ""),
+         "start": e.get("timeInterval", {}).get("start")}
+        for e in entries
+    ]
+    plan["fingerprint"] = fingerprint([], entries)
+    return plan
+
+
+def summarize(plan):
+    reasons = Counter(item["reason"] for item in plan["skipped"])
+    conflicts = reasons.get(SkipReason.CONFLICT.value, 0)
+    skipped = ", ".join(f"{reason} {count}" for reason, count in reasons.most_common()) or "none"
+    return (f"{len(plan['creates'])} creates, {len(plan['deletes'])} deletes, "
+            f"{conflicts} conflicts; skipped: {skipped}")
+
+
+def save_plan(path, plan):
+    atomic_write_json(path, plan, indent=2)
+
+
+def load_plan(path):
+    try:
+        plan = read_json(path)
+    except (OSError, ValueError) as e:
+        raise PlanError(f"[ERROR] Failed to read plan {path}: {e}")
+    if plan.get("version") != PLAN_VERSION:
+        raise PlanError(f"[ERROR] {path} is not a plan written by this version of the tool.")
+    return plan
+
+
+def apply_plan(plan, calendar, clockify, config, concurrency, batch_size=BULK_DELETE_BATCH_SIZE):
+    """
+    Execute a plan exactly: creates run in parallel through a WritePipeline,
+    deletes go out as bulk requests. Refuses to run if the plan was made for
+    another calendar or workspace, or if the events or entries it was made
+    from have changed since. Returns the WritePipeline with the outcomes.
+    """
+    if plan["workspace_id"] != config["CLOCKIFY_WORKSPACE_ID"] or (
+            plan["kind"] == "sync" and plan["calendar_id"] != config["GOOGLE_CALENDAR_ID"]):
+        raise PlanError("[ERROR] The plan was made for a different calendar or Clockify workspace.")
+    events, entries = _read_state(plan, calendar, clockify)
+    if fingerprint(events, entries) != plan["fingerprint"]:
+        raise PlanError(f"[ERROR] The plan made at {plan['created_at']} is stale: calendar events or Clockify "
+                        f"entries changed since. Run --plan again.")
+
+    started = time.monotonic()
+    writer = WritePipeline(concurrency)
+    for item in plan["creates"]:
+        writer.submit(f"Create '{item['description']}' at {item['start']}", clockify.create_time_entry,
+                      item["start"], item["end"], item["description"], item["project_id"],
+                      tags=[TAG_CALENDAR_BOT])
+    entry_ids = [item["entry_id"] for item in plan["deletes"]]
+    for i in range(0, len(entry_ids), batch_size):
+        batch = entry_ids[i:i + batch_size]
+        writer.submit(f"Bulk delete of {len(batch)} entries", clockify.delete_time_entries, batch)
+    writer.close()
+    log.info("Applied plan in %.1fs: %s", time.monotonic() - started, writer.summary(), extra=SUMMARY)
+    return writer
+
+
+def log_plan(plan):
+    """Log every planned action, then the totals."""
+    for item in plan["creates"]:
+        log.info("[PLAN] Create: %s from %s to %s -> Project: %s", item["description"], item["start"],
+                 item["end"], item["project"], extra={"event_id": item["event_id"], "project": item["project"]})
+    for item in plan["deletes"]:
+        log.info("[PLAN] Delete: %s at %s", item["description"], item["start"],
+                 extra={"entry_id": item["entry_id"]})
+    log.info("Plan: %s", summarize(plan), extra=SUMMARY)
@@ -0,0 +1,203 @@
+from collections import Counter
+from datetime import timedelta
+from event_record import EventRecord, SkipReason
+from matcher import match_project
+from metrics import METRICS
+from progress import PROGRESS
+from run_log import event_fields, log
+from time_entry_index import CONFLICT, DUPLICATE, TimeEntryIndex, format_instant, to_instant
+
+TAG_CALENDAR_BOT = "calendar-bot"
+
+# Message logged for each filter-chain skip reason
+SKIP_MESSAGES = {
+    SkipReason.RECLAIM_TASK: "Skipping Reclaim task",
+    SkipReason.ALL_DAY: "Skipping all-day event",
+    SkipReason.NOPROJECT_TAG: "Skipping event due to '#noproject' tag in description",
+    SkipReason.NO_INVITEES: "Skipping event without invitees",
+    SkipReason.IGNORED_ATTENDEE_ONLY: "Skipping 1-on-1 meeting with ignored attendee",
+    SkipReason.EXTERNAL_WITHOUT_PARTICIPANT: "Skipping external event without valid participant",
+    SkipReason.NOT_ACCEPTED: "Skipping event not accepted by self"
+}
+
+def skip(reason, skipped=None):
+    METRICS.inc("skipped_events", reason=reason.value)
+    if skipped is not None:
+        skipped[reason] += 1
+
+def select_project(event, clockify, rules, ignored_emails, self_email, skipped=None):
+    """
+    Run the filter chain for one event (a raw event dict or an EventRecord).
+    Returns (project_id, project_name) if the event should be logged,
+    otherwise logs why it is skipped, counts the reason in skipped (a
+    Counter), and returns None.
+    """
+    record = event if isinstance(event, EventRecord) else EventRecord(event, self_email)
+    with METRICS.phase("filtering"):
+        reason = record.skip_reason(ignored_emails)
+    if reason:
+        skip(reason, skipped)
+        log.info("%s: %s", SKIP_MESSAGES[reason], record.title, extra=event_fields(record.event, reason))
+        return None
+
+    with METRICS.phase("matching"):
+        project_name = match_project(record, rules)
+        project_id = clockify.resolve_project_name(project_name) if project_name else None
+
+    if project_name and not project_id:
+        skip(SkipReason.UNKNOWN_PROJECT, skipped)
+        log.warning("No Clockify project found for name: '%s' — will skip entry.", project_name,
+                    extra=event_fields(record.event, SkipReason.UNKNOWN_PROJECT, project_name))
+        return None
+
+    return project_id, project_name
+
+def fetch_entries_around(clockify, start, end):
+    """
+    Fetch the Clockify entries that may overlap start..end (ISO strings).
+    The window is padded by a day on both sides, because Clockify filters
+    on entry start and an overlapping entry may begin before the window.
+    """
+    padding = timedelta(days=1).total_seconds()
+    with METRICS.phase("duplicate_lookup"):
+        return clockify.get_time_entries(
+            format_instant(to_instant(start) - padding), format_instant(to_instant(end) + padding)
+        )
+
+def fetch_entry_index(clockify, start, end):
+    """
+    Load the Clockify entries around start..end into a TimeEntryIndex.
+    """
+    entries = fetch_entries_around(clockify, start, end)
+    with METRICS.phase("duplicate_lookup"):
+        return TimeEntryIndex(entries)
+
+def resolve_overlap(index, event, start, end, project_id, policy, skipped=None):
+    """
+    Check an event's interval against the existing entries and apply the
+    overlap policy ("skip", "trim" or "log"). Returns the (start, end) to
+    log, or None if nothing should be logged. Exact duplicates are always
+    skipped; "trim" keeps the longest part of the event no entry covers.
+    """
+    summary = event.get("summary", "No title")
+    with METRICS.phase("duplicate_lookup"):
+        status, _ = index.lookup(start, end, project_id)
+    if status is None:
+        return start, end
+    if status == DUPLICATE:
+        skip(SkipReason.DUPLICATE, skipped)
+        log.info("Skipping duplicate entry for %s at %s", summary, start,
+                 extra=event_fields(event, SkipReason.DUPLICATE, project_id))
+        return None
+
+    reason = SkipReason.CONFLICT if status == CONFLICT else SkipReason.OVERLAP
+    what = "a different project" if status == CONFLICT else "the same project"
+    if policy == "log":
+        METRICS.inc("overlapping_events", policy=policy)
+        log.warning("'%s' at %s overlaps an entry of %s; logging it anyway.", summary, start, what,
+                    extra=event_fields(event, reason, project_id))
+        return start, end
+    if policy == "trim":
+        gaps = index.uncovered(start, end)
+        if gaps:
+            METRICS.inc("overlapping_events", policy=policy)
+            trimmed = max(gaps, key=lambda gap: to_instant(gap[1]) - to_instant(gap[0]))
+            log.info("Trimming '%s' to %s - %s around existing entries of %s", summary, trimmed[0], trimmed[1],
+                     what, extra=event_fields(event, reason, project_id))
+            return trimmed
+    skip(reason, skipped)
+    if status == CONFLICT:
+        log.warning("Conflicting time entry for a different project overlaps '%s' at %s!", summary, start,
+                    extra=event_fields(event, reason, project_id))
+    else:
+        log.info("Skipping '%s' at %s: overlaps an entry of the same project", summary, start,
+                 extra=event_fields(event, reason, project_id))
+    return None
+
+def process_events(events, clockify, rules, ignored_emails, self_email, args, entry_index=None, writer=None):
+    """
+    Filter, match and log events. Returns a Counter of SkipReason.
+    """
+    skipped = Counter()
+    for event in events:
+        METRICS.inc("events_seen")
+        PROGRESS.event()
+        record = EventRecord(event, self_email)
+        selected = select_project(record, clockify, rules, ignored_emails, self_email, skipped)
+        if selected is None:
+            continue
+        project_id, project_name = selected
+        summary = record.title
+        start = record.start
+        end = record.end
+
+        fields = event_fields(event, project=project_name)
+        if args.simulate:
+            log.info("[SIMULATION] Would log: %s from %s to %s -> Proj. ID: %s, Project Name: %s",
+                     summary, start, end, project_id, project_name, extra=fields)
+        else:
+            log.info("Logging: %s from %s to %s -> Project: %s", summary, start, end, project_id, extra=fields)
+            index = entry_index
+            if index is None:
+                # Without a prefetched index, fall back to a lookup for this event only
+                index = fetch_entry_index(clockify, start, end)
+            interval = resolve_overlap(index, event, start, end, project_id, args.overlap_policy, skipped)
+            if interval is None:
+                continue
+            start, end = interval
+            if writer is not None:
+                writer.submit(f"Create '{summary}' at {start}", clockify.create_time_entry,
+                              start, end, summary, project_id, tags=[TAG_CALENDAR_BOT])
+            else:
+                with METRICS.phase("writes"):
+                    clockify.create_time_entry(start, end, summary, project_id, tags=[TAG_CALENDAR_BOT])
+                PROGRESS.write()
+            # Later events in this run must see the entry, even while its write is in flight
+            index.add(start, end, project_id)
+    return skipped
+
+def sync_range(calendar, clockify, config, args, start_date, end_date, writer):
+    """
+    Sync every day from start_date to end_date (UTC datetimes at midnight):
+    one calendar fetch and one Clockify entry fetch for the whole range, then
+    a day-by-day pass over the in-memory events. Writes are queued on writer.
+    Returns a Counter of SkipReason for the whole range.
+    """
+    range_start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    range_end = end_date.replace(hour=23, minute=59, second=59, microsecond=0)
+
+    # Fetch every existing entry for the range once so duplicate and overlap
+    # checks run against an in-memory index.
+    entry_index = None
+    if not args.simulate:
+        entry_index = fetch_entry_index(clockify, range_start.isoformat(), range_end.isoformat())
+        log.info("Loaded %d existing Clockify entries for duplicate checks", len(entry_index))
+
+    # One paginated pass over the whole range; the day loop below only
+    # consumes the in-memory groups.
+    with METRICS.phase("calendar_fetch"):
+        events_by_day = calendar.get_events_by_day(range_start.isoformat(), range_end.isoformat())
+    # Events whose local start day falls just outside the UTC range (offsets
+    # around midnight) are handled with the nearest day of the range.
+    for day in [d for d in events_by_day if not start_date.date() <= d <= end_date.date()]:
+        nearest = start_date.date() if day < start_date.date() else end_date.date()
+        events_by_day[nearest].extend(events_by_day.pop(day))
+
+    skipped = Counter()
+    current_day = start_date
+    while current_day <= end_date:
+        log.info("Processing date: %s", current_day.date())
+        PROGRESS.day(current_day.date())
+        events = events_by_day.get(current_day.date(), [])
+
+        skipped += process_events(events, clockify, config["rules"], config["ignored_emails"], config["self_email"], args,
+                       entry_index=entry_index, writer=writer)
+        log.info("Finished processing date: %s", current_day.date())
+        current_day += timedelta(days=1)
+    return skipped
+
+def format_skipped(skipped):
+    """One-line summary of a Counter of SkipReason, most frequent first."""
+    if not skipped:
+        return "none"
+    return ", ".join(f"{reason.value} {count}" for reason, count in skipped.most_common())
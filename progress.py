@@ -0,0 +1,67 @@
+import queue
+import threading
+
+
+class Cancelled(BaseException):
+    """
+    Raised at the next API call or event once a run is cancelled. Derives
+    from BaseException, like KeyboardInterrupt, so the per-write and
+    per-profile `except Exception` handlers don't swallow it.
+    """
+
+
+class RunProgress:
+    """
+    Live progress of a run for the GUI. The sync reports the day it is on,
+    events handled, writes done and API requests, from any thread; while a
+    window is attached each report is posted to a thread-safe queue the Tk
+    loop drains. Unattached (headless runs) the reports are no-ops.
+
+    cancel() asks the run to stop: the next API request or event raises
+    Cancelled, so the run stops between calls instead of mid-request.
+    """
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.updates = None
+
+    def attach(self):
+        """Start queueing updates and clear a previous cancel. Returns the queue."""
+        self.cancelled.clear()
+        self.updates = queue.SimpleQueue()
+        return self.updates
+
+    def detach(self):
+        self.updates = None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise Cancelled()
+
+    def _post(self, kind, value=None):
+        updates = self.updates
+        if updates is not None:
+            updates.put((kind, value))
+
+    def day(self, day):
+        self._post("day", day)
+
+    def event(self):
+        self.check()
+        self._post("event")
+
+    def write(self):
+        self._post("write")
+
+    def message(self, text):
+        self._post("message", text)
+
+    def request(self):
+        """Called before every API request: stops a cancelled run, then counts the request."""
+        self.check()
+        self._post("request")
+
+
+PROGRESS = RunProgress()
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from bisect import bisect_left
+
+FIELDS = ("name", "client")
+OUTPUT_FORMATS = ("table", "csv", "json")
+
+
+def _fuzzy_score(query, text):
+    """
+    Score text for query as a subsequence match: None if the characters of
+    query don't appear in order, otherwise higher for matches that start
+    earlier and have fewer gaps.
+    """
+    position = -1
+    first = None
+    gaps = 0
+    for char in query:
+        found = text.find(char, position + 1)
+        if found < 0:
+            return None
+        if first is None:
+            first = found
+        elif found > position + 1:
+            gaps += 1
+        position = found
+    return -(gaps * 10 + (first or 0))
+
+
+class ProjectCatalog:
+    """
+    Searchable in-memory listing of Clockify projects. Project and client
+    names are casefolded and kept sorted once, so prefix searches are a
+    bisect plus the matching slice; substring and fuzzy searches scan the
+    folded names without touching the raw project dicts.
+    """
+    def __init__(self, projects):
+        self.projects = sorted(projects, key=lambda p: p["name"].casefold())
+        self._folded = {
+            field: [(p.get(self._key(field)) or "").casefold() for p in self.projects] for field in FIELDS
+        }
+        self._sorted = {
+            field: sorted((value, i) for i, value in enumerate(self._folded[field])) for field in FIELDS
+        }
+
+    @staticmethod
+    def _key(field):
+        return "clientName" if field == "client" else "name"
+
+    def __len__(self):
+        return len(self.projects)
+
+    def _prefix(self, field, query):
+        index = self._sorted[field]
+        position = bisect_left(index, (query, -1))
+        matches = set()
+        while position < len(index) and index[position][0].startswith(query):
+            matches.add(index[position][1])
+            position += 1
+        return matches
+
+    def search(self, query="", fields=FIELDS, mode="prefix", include_archived=False):
+        """
+        Return the projects whose name or client (per fields) matches query.
+        mode is "prefix", "substring" or "fuzzy"; fuzzy results come best
+        match first, the others in name order. Matching ignores case.
+        """
+        query = query.casefold()
+        if not query:
+            candidates = {i: 0 for i in range(len(self.projects))}
+        elif mode == "prefix":
+            candidates = {i: 0 for field in fields for i in self._prefix(field, query)}
+        elif mode == "substring":
+            candidates = {
+                i: 0 for field in fields for i, value in enumerate(self._folded[field]) if query in value
+            }
+        elif mode == "fuzzy":
+            candidates = {}
+            for field in fields:
+                for i, value in enumerate(self._folded[field]):
+                    score = _fuzzy_score(query, value)
+                    if score is not None and score > candidates.get(i, float("-inf")):
+                        candidates[i] = score
+        else:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        order = sorted(candidates, key=lambda i: (-candidates[i], i))
+        return [self.projects[i] for i in order if include_archived or not self.projects[i]["archived"]]
+
+
+def format_projects(projects, output_format="table"):
+    """Render projects as an aligned table, CSV or a JSON array."""
+    rows = [
+        {"name": p["name"], "client": p.get("clientName") or "", "id": p["id"], "archived": p["archived"]}
+        for p in projects
+    ]
+    if output_format == "json":
+        return json.dumps(rows, indent=2, ensure_ascii=False)
+    if output_format == "csv":
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=["name", "client", "id", "archived"], lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+        return out.getvalue().rstrip("\n")
+    lines = [f"{'Project Name':40} | {'Client':25} | {'ID':24} | Archived", "-" * 105]
+    for row in rows:
+        lines.append(f"{row['name'][:40]:40} | {row['client'][:25]:25} | {row['id']:24} | {row['archived']}")
+    return "\n".join(lines)
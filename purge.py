@@ -0,0 +1,53 @@
+import time
+from metrics import METRICS
+from run_log import log
+from write_pipeline import WritePipeline
+
+BULK_DELETE_BATCH_SIZE = 100  # IDs per bulk delete request, keeps the URL short
+
+
+class PurgeResult:
+    def __init__(self, found, deleted, failed, elapsed):
+        self.found = found
+        self.deleted = deleted
+        self.failed = failed
+        self.elapsed = elapsed
+
+    def summary(self):
+        return (f"{self.deleted} of {self.found} entries deleted in {self.elapsed:.1f}s"
+                + (f", {len(self.failed)} batches failed" if self.failed else ""))
+
+
+def purge_bot_entries(clockify, tag_id, start, end, simulate=False,
+                      batch_size=BULK_DELETE_BATCH_SIZE, concurrency=1):
+    """
+    Delete every entry tagged with tag_id between start and end (ISO strings):
+    one paginated, server-side tag-filtered fetch for the whole range, then
+    bulk deletes in batches of IDs.
+    """
+    with METRICS.phase("purge"):
+        return _purge(clockify, tag_id, start, end, simulate, batch_size, concurrency)
+
+
+def _purge(clockify, tag_id, start, end, simulate, batch_size, concurrency):
+    started = time.monotonic()
+    entries = clockify.get_time_entries(start, end, tag_ids=[tag_id])
+    # The tag filter is applied by Clockify; re-check so a misconfigured
+    # server can never widen the purge to untagged entries.
+    entries = [e for e in entries if tag_id in e.get("tagIds", [])]
+
+    if simulate:
+        for entry in entries:
+            log.info("  [SIMULATION] Would delete entry: %s at %s", entry.get("description", ""),
+                     entry.get("timeInterval", {}).get("start"), extra={"entry_id": entry.get("id")})
+        return PurgeResult(len(entries), 0, [], time.monotonic() - started)
+
+    writer = WritePipeline(concurrency)
+    entry_ids = [e["id"] for e in entries]
+    for i in range(0, len(entry_ids), batch_size):
+        batch = entry_ids[i:i + batch_size]
+        writer.submit(f"Bulk delete of {len(batch)} entries", clockify.delete_time_entries, batch)
+    writer.close()
+
+    deleted = sum(len(result) for _, result in writer.succeeded)
+    return PurgeResult(len(entries), deleted, writer.failed, time.monotonic() - started)
@@ -0,0 +1,68 @@
+import time
+from entry_store import NO_PROJECT, EntryStoreCache
+from metadata_cache import key_fingerprint
+from processing import TAG_CALENDAR_BOT
+from run_log import SUMMARY, log
+from time_entry_index import to_instant
+
+GROUP_BY = ("project", "day", "week")
+
+
+def _hours(seconds):
+    return f"{seconds / 3600:8.2f}"
+
+
+def _share(part, total):
+    return f"{100 * part / total:5.1f}%" if total else "    -"
+
+
+def format_report(summary, group_by, label):
+    """
+    Render a TimeEntryStore summary as a table of hours per group, largest
+    first for projects and in time order for days and weeks, followed by the
+    totals. label turns a group key into its display name.
+    """
+    groups = summary["groups"]
+    if group_by == "project":
+        keys = sorted(groups, key=lambda key: -groups[key])
+    else:
+        keys = sorted(groups)
+    title = group_by.capitalize()
+    lines = [f"{title:40} | {'Hours':>8} | {'Share':>6}", "-" * 60]
+    for key in keys:
+        lines.append(f"{label(key)[:40]:40} | {_hours(groups[key])} | {_share(groups[key], summary['total'])}")
+    lines.append("-" * 60)
+    total = summary["total"]
+    manual = total - summary["bot"]
+    lines.append(f"{'Total':40} | {_hours(total)} | {summary['entries']} entries")
+    lines.append(f"{'  logged by calendar-bot':40} | {_hours(summary['bot'])} | {_share(summary['bot'], total)}")
+    lines.append(f"{'  logged manually':40} | {_hours(manual)} | {_share(manual, total)}")
+    lines.append(f"{'  without a project':40} | {_hours(summary['unmatched'])} | {_share(summary['unmatched'], total)}")
+    return "\n".join(lines)
+
+
+def run_report(clockify, cache_path, range_start, range_end, group_by="project", refresh=False):
+    """
+    Report the hours logged from range_start to range_end (ISO strings),
+    grouped by project, day or week, with the calendar-bot vs manual split
+    and the time without a project. Entries come from the columnar cache at
+    cache_path when it covers the range.
+    """
+    started = time.monotonic()
+    cache = EntryStoreCache(clockify.workspace_id, key_fingerprint(clockify.api_key), cache_path)
+    store, cached = cache.load(clockify, range_start, range_end, refresh)
+    summary = store.summarize(to_instant(range_start), to_instant(range_end), group_by,
+                              bot_tag_id=clockify.get_tag_id(TAG_CALENDAR_BOT))
+
+    def label(key):
+        if group_by != "project":
+            return str(key)
+        if key == NO_PROJECT:
+            return "(no project)"
+        project_id = store.project_ids.values[key]
+        return clockify.metadata.project_name(clockify, project_id) or project_id
+
+    log.info("Hours from %s to %s by %s:\n%s", range_start[:10], range_end[:10], group_by,
+             format_report(summary, group_by, label), extra=SUMMARY)
+    log.info("Report built in %.2fs from %s", time.monotonic() - started,
+             "the entry cache" if cached else f"{len(store)} downloaded entries", extra=SUMMARY)
@@ -0,0 +1,119 @@
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE = "unmatched_events.log"
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024  # Rotate log files at this size; 0 disables rotation
+BACKUP_COUNT = 3
+EVENT_FIELDS = ("event_id", "entry_id", "date", "reason", "project")
+
+log = logging.getLogger("calendarbot")
+
+# Pass as extra= to mark a line --quiet still prints
+SUMMARY = {"summary": True}
+
+_listener = None
+_handlers = []
+
+
+def event_fields(event, reason=None, project=None):
+    """
+    extra= fields describing one calendar event, for the JSONL log.
+    reason may be a SkipReason or a plain string.
+    """
+    start = event.get("start", {})
+    day = (start.get("dateTime") or start.get("date") or "")[:10]
+    return {
+        "event_id": event.get("id"),
+        "date": day or None,
+        "reason": getattr(reason, "value", reason),
+        "project": project
+    }
+
+
+class ConsoleFormatter(logging.Formatter):
+    """
+    Lines about a single event or entry print as-is; run-level lines and
+    every warning or error get a [LEVEL] prefix.
+    """
+    def format(self, record):
+        message = super().format(record)
+        per_item = hasattr(record, "event_id") or hasattr(record, "entry_id")
+        if record.levelno >= logging.WARNING or not per_item:
+            return f"[{record.levelname}] {message}"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname.lower(),
+            "message": record.getMessage()
+        }
+        for field in EVENT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        return json.dumps(data, ensure_ascii=False)
+
+
+class QuietFilter(logging.Filter):
+    """Let through only summary lines and errors."""
+    def filter(self, record):
+        return getattr(record, "summary", False) or record.levelno >= logging.ERROR
+
+
+def _file_handler(path, max_bytes):
+    # delay=True: the file is only created once something is written to it
+    return RotatingFileHandler(path, maxBytes=max_bytes, backupCount=BACKUP_COUNT if max_bytes else 0,
+                               encoding="utf-8", delay=True)
+
+
+def setup_logging(quiet=False, log_file=LOG_FILE, jsonl_file=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Route the "calendarbot" logger to the console, to log_file (warnings and
+    errors) and optionally to jsonl_file (every line, one JSON object each).
+    File writes go through a queue to a background thread, so logging never
+    blocks the sync on disk I/O. Call shutdown_logging() to flush.
+    """
+    global _listener
+    shutdown_logging()
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(ConsoleFormatter("%(message)s"))
+    if quiet:
+        console.addFilter(QuietFilter())
+
+    warnings = _file_handler(log_file, max_bytes)
+    warnings.setLevel(logging.WARNING)
+    warnings.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    file_handlers = [warnings]
+    if jsonl_file:
+        structured = _file_handler(jsonl_file, max_bytes)
+        structured.setFormatter(JsonFormatter())
+        file_handlers.append(structured)
+
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, *file_handlers, respect_handler_level=True)
+    _listener.start()
+    _handlers.extend([console, QueueHandler(records)])
+    for handler in _handlers:
+        log.addHandler(handler)
+
+
+def shutdown_logging():
+    """Flush queued records to disk and detach the handlers."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    for handler in _handlers:
+        log.removeHandler(handler)
+    _handlers.clear()
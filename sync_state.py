@@ -0,0 +1,121 @@
+import json
+import sqlite3
+import threading
+from time_entry_index import normalize_timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_tokens (
+    calendar_id TEXT PRIMARY KEY,
+    token TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    etag TEXT,
+    updated TEXT,
+    status TEXT,
+    start TEXT,
+    payload TEXT NOT NULL,
+    entry_id TEXT,
+    processed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_pending ON events (calendar_id, processed, start);
+"""
+
+
+def _event_start(event):
+    start = event.get("start", {})
+    value = start.get("dateTime") or start.get("date")
+    return normalize_timestamp(value) if value else None
+
+
+class SyncState:
+    """
+    Local SQLite store for incremental sync: the calendar's nextSyncToken and,
+    per Google event, its latest version and the Clockify entry logged for it.
+    """
+    def __init__(self, path):
+        self.path = path
+        # Writes may complete on worker threads, so serialize access ourselves
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def get_sync_token(self, calendar_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT token FROM sync_tokens WHERE calendar_id = ?", (calendar_id,)
+            ).fetchone()
+        return row["token"] if row else None
+
+    def set_sync_token(self, calendar_id, token):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_tokens (calendar_id, token) VALUES (?, ?)",
+                (calendar_id, token)
+            )
+            self._conn.commit()
+
+    def record_change(self, calendar_id, event):
+        """
+        Store the latest version of an event. Returns False if this exact
+        version was already processed, so the caller can skip it.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, processed FROM events WHERE calendar_id = ? AND event_id = ?",
+                (calendar_id, event["id"])
+            ).fetchone()
+            if row and row["processed"] and row["etag"] == event.get("etag"):
+                return False
+            self._conn.execute(
+                """
+                INSERT INTO events (calendar_id, event_id, etag, updated, status, start, payload, processed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                ON CONFLICT (calendar_id, event_id) DO UPDATE SET
+                    etag = excluded.etag, updated = excluded.updated, status = excluded.status,
+                    start = COALESCE(excluded.start, events.start), payload = excluded.payload,
+                    processed = 0
+                """,
+                (calendar_id, event["id"], event.get("etag"), event.get("updated"),
+                 event.get("status"), _event_start(event), json.dumps(event))
+            )
+            return True
+
+    def pending_events(self, calendar_id, start, end):
+        """
+        Yield (event, entry_id) for every unprocessed event that is either
+        already mapped to a Clockify entry, cancelled, or starts between
+        start and end (normalized UTC strings).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT payload, entry_id FROM events
+                WHERE calendar_id = ? AND processed = 0
+                  AND (entry_id IS NOT NULL OR status = 'cancelled' OR start BETWEEN ? AND ?)
+                ORDER BY start
+                """,
+                (calendar_id, start, end)
+            ).fetchall()
+        for row in rows:
+            yield json.loads(row["payload"]), row["entry_id"]
+
+    def mark_processed(self, calendar_id, event_id, entry_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE events SET processed = 1, entry_id = ? WHERE calendar_id = ? AND event_id = ?",
+                (entry_id, calendar_id, event_id)
+            )
@@ -0,0 +1,177 @@
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+# lookup() results
+DUPLICATE = "duplicate"  # Same interval, same project
+OVERLAP = "overlap"      # Overlaps entries of the same project only
+CONFLICT = "conflict"    # Overlaps an entry of a different project
+
+
+def to_instant(value):
+    """
+    Parse an ISO 8601 timestamp to a UTC POSIX timestamp, so Calendar offsets
+    (+03:00) and Clockify 'Z' times compare as the same instant.
+    """
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def format_instant(instant):
+    return datetime.fromtimestamp(instant, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def normalize_timestamp(value):
+    """
+    Normalize an ISO 8601 timestamp to a UTC 'YYYY-MM-DDTHH:MM:SSZ' string so
+    Calendar offsets (+03:00) and Clockify 'Z' times compare equal.
+    """
+    if value is None:
+        return None
+    return format_instant(to_instant(value))
+
+
+BLOCK_SIZE = 256  # Intervals per block of a _LengthBucket before it is split
+
+
+class _LengthBucket:
+    """
+    Intervals of similar length, sorted by start in blocks of at most
+    2 * BLOCK_SIZE, so an insert shifts one block instead of the whole list.
+    max_length is the longest interval added, which bounds how far before a
+    query an overlapping interval can start.
+    """
+    def __init__(self, intervals=()):
+        intervals = list(intervals)
+        self.max_length = max((end - start for start, end, _ in intervals), default=0)
+        self._blocks = [intervals[i:i + BLOCK_SIZE] for i in range(0, len(intervals), BLOCK_SIZE)]
+        self._starts = [[start for start, _, _ in block] for block in self._blocks]
+        self._firsts = [starts[0] for starts in self._starts]
+
+    def add(self, interval):
+        start, end, _ = interval
+        self.max_length = max(self.max_length, end - start)
+        if not self._blocks:
+            self._blocks.append([interval])
+            self._starts.append([start])
+            self._firsts.append(start)
+            return
+        i = max(bisect_right(self._firsts, start) - 1, 0)
+        block, starts = self._blocks[i], self._starts[i]
+        position = bisect_right(starts, start)
+        block.insert(position, interval)
+        starts.insert(position, start)
+        self._firsts[i] = starts[0]
+        if len(block) > 2 * BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+            self._starts[i:i + 1] = [starts[:BLOCK_SIZE], starts[BLOCK_SIZE:]]
+            self._firsts[i:i + 1] = [starts[0], starts[BLOCK_SIZE]]
+
+    def overlapping(self, start, end):
+        """Yield the intervals that overlap start..end (UTC instants)."""
+        low = start - self.max_length
+        i = max(bisect_right(self._firsts, low) - 1, 0)
+        for block, starts in zip(self._blocks[i:], self._starts[i:]):
+            for interval in block[bisect_right(starts, low):bisect_left(starts, end)]:
+                if interval[1] > start:
+                    yield interval
+            if starts[-1] >= end:
+                return
+
+
+def _length_class(start, end):
+    """Bucket key for an interval: lengths within a factor of two share one."""
+    return math.ceil(end - start).bit_length()
+
+
+class TimeEntryIndex:
+    """
+    In-memory index of Clockify time entries as UTC instants. Exact intervals
+    are kept in a dict for duplicate checks, with the entry logged for each
+    project, so a duplicate can be traced to its entry. Every interval is
+    also kept in a _LengthBucket for its length class (lengths within a
+    factor of two), so an overlap query only scans, per class, the entries
+    starting within that class's longest length before the queried interval.
+    One multi-day entry then only widens the scan of its own class, and
+    queries stay O(b log n + k) with b the number of length classes
+    (a handful) and k the number of nearby entries.
+    """
+    def __init__(self, entries=()):
+        self._by_interval = {}
+        by_class = {}
+        for entry in entries:
+            interval = entry.get("timeInterval", {})
+            parsed = self._parse(interval.get("start"), interval.get("end"))
+            if parsed:
+                by_class.setdefault(_length_class(*parsed), []).append((parsed[0], parsed[1], entry.get("projectId")))
+                self._by_interval.setdefault(parsed, {}).setdefault(entry.get("projectId"), entry)
+        self._buckets = {
+            length_class: _LengthBucket(sorted(intervals, key=lambda i: i[0]))
+            for length_class, intervals in by_class.items()
+        }
+        self._count = sum(len(intervals) for intervals in by_class.values())
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def _parse(start, end):
+        if not start or not end:
+            return None  # Running timers have no end yet
+        return to_instant(start), to_instant(end)
+
+    def add(self, start, end, project_id, entry=None):
+        """Add an interval; entry is the Clockify entry, if it is known yet."""
+        parsed = self._parse(start, end)
+        if not parsed:
+            return
+        length_class = _length_class(*parsed)
+        bucket = self._buckets.get(length_class)
+        if bucket is None:
+            bucket = self._buckets[length_class] = _LengthBucket()
+        bucket.add((parsed[0], parsed[1], project_id))
+        self._by_interval.setdefault(parsed, {}).setdefault(project_id, entry)
+        self._count += 1
+
+    def overlaps(self, start, end):
+        """
+        Return the (start, end, project_id) intervals, as UTC instants, that
+        overlap start..end. Intervals that only touch it don't count.
+        """
+        start, end = to_instant(start), to_instant(end)
+        return [interval for bucket in self._buckets.values() for interval in bucket.overlapping(start, end)]
+
+    def lookup(self, start, end, project_id):
+        """
+        Return (status, entry): status is DUPLICATE if the interval is already
+        logged for this project, CONFLICT if it overlaps an entry of a
+        different project, OVERLAP if it only overlaps entries of this
+        project, otherwise None. entry is the duplicated Clockify entry, or
+        None if there is none or it was added without one.
+        """
+        projects = self._by_interval.get((to_instant(start), to_instant(end)))
+        if projects and project_id in projects:
+            return DUPLICATE, projects[project_id]
+        overlapping = self.overlaps(start, end)
+        if not overlapping:
+            return None, None
+        if any(other != project_id for _, _, other in overlapping):
+            return CONFLICT, None
+        return OVERLAP, None
+
+    def uncovered(self, start, end):
+        """
+        Return the parts of start..end not covered by any entry, as
+        (start, end) UTC 'Z' strings in time order.
+        """
+        cursor, end_instant = to_instant(start), to_instant(end)
+        gaps = []
+        for other_start, other_end, _ in sorted(self.overlaps(start, end), key=lambda i: i[0]):
+            if other_start > cursor:
+                gaps.append((cursor, other_start))
+            cursor = max(cursor, other_end)
+        if cursor < end_instant:
+            gaps.append((cursor, end_instant))
+        return [(format_instant(s), format_instant(e)) for s, e in gaps]
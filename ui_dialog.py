@@ -1,10 +1,17 @@
+import logging
+import queue
 import sys
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 from tkcalendar import DateEntry
 from types import SimpleNamespace
+from collections import deque
 from datetime import datetime, timezone
+from progress import PROGRESS, Cancelled
+from run_log import ConsoleFormatter, log
 
 def get_parameters_via_dialog():
     class ParamDialog:
@@ -32,9 +39,13 @@ def get_parameters_via_dialog():
             self.purge_var = tk.BooleanVar()
             self.purge_cb = ttk.Checkbutton(self.top, text="Purge (delete bot entries)", variable=self.purge_var)
             self.purge_cb.grid(row=3, column=0, columnspan=2, sticky="w", padx=5)
+            # Backfill checkbox
+            self.backfill_var = tk.BooleanVar()
+            self.backfill_cb = ttk.Checkbutton(self.top, text="Backfill (ranges over 31 days, weekly windows)", variable=self.backfill_var)
+            self.backfill_cb.grid(row=4, column=0, columnspan=2, sticky="w", padx=5)
             # Buttons
             btn_frame = ttk.Frame(self.top)
-            btn_frame.grid(row=4, column=0, columnspan=2, pady=10)
+            btn_frame.grid(row=5, column=0, columnspan=2, pady=10)
             ttk.Button(btn_frame, text="OK", command=self.ok).pack(side="left", padx=5)
             ttk.Button(btn_frame, text="Cancel", command=self.cancel).pack(side="left", padx=5)
             self.top.bind('<Return>', lambda event: self.ok())
@@ -44,6 +55,7 @@ def get_parameters_via_dialog():
             end = self.end_cal.get_date().strftime("%Y-%m-%d")
             simulate = self.simulate_var.get()
             purge = self.purge_var.get()
+            backfill = self.backfill_var.get()
             # Validate dates
             try:
                 start_date = datetime.strptime(start, "%Y-%m-%d").replace(tzinfo=timezone.utc)
@@ -54,14 +66,15 @@ def get_parameters_via_dialog():
             if start_date > end_date:
                 messagebox.showerror("Input Error", "Start date cannot be after end date.")
                 return
-            if (end_date - start_date).days > 31:
-                messagebox.showerror("Input Error", "Date range cannot exceed 31 days.")
+            if (end_date - start_date).days > 31 and not backfill:
+                messagebox.showerror("Input Error", "Date range cannot exceed 31 days. Check Backfill for longer ranges.")
                 return
             self.result = SimpleNamespace(
                 start=start,
                 end=end,
                 simulate=simulate,
-                purge=purge
+                purge=purge,
+                backfill=backfill
             )
             self.top.destroy()
         def cancel(self):
@@ -71,6 +84,148 @@ def get_parameters_via_dialog():
     root.withdraw()
     dialog = ParamDialog(root)
     root.wait_window(dialog.top)
+    # The progress window opens its own root once the run starts
+    root.destroy()
     if dialog.result is None:
         return None
-    return dialog.result 
\ No newline at end of file
+    return dialog.result
+
+
+class _WindowLogHandler(logging.Handler):
+    """Forward run summaries, warnings and errors to the progress window."""
+    def emit(self, record):
+        if getattr(record, "summary", False) or record.levelno >= logging.WARNING:
+            PROGRESS.message(self.format(record))
+
+
+class ProgressWindow:
+    """
+    Tk window for a run on a worker thread. The worker never touches Tk: it
+    reports through PROGRESS, whose queue this window drains every
+    POLL_INTERVAL_MS, so the UI stays responsive however long the run is.
+    Cancel asks the run to stop at its next API call; closing the window
+    does the same and waits for the worker before exiting.
+    """
+    POLL_INTERVAL_MS = 100
+    RATE_WINDOW = 5.0  # Seconds of request history the shown rate averages over
+
+    def __init__(self, target, start, end):
+        self.target = target
+        self.first_day = datetime.strptime(start, "%Y-%m-%d").date()
+        self.total_days = (datetime.strptime(end, "%Y-%m-%d").date() - self.first_day).days + 1
+        self.events = 0
+        self.writes = 0
+        self.requests = 0
+        self.request_times = deque()
+        self.started = time.monotonic()
+        self.worker = None
+        self.done = False
+        self.closing = False
+
+        self.root = tk.Tk()
+        self.root.title("Calendar to Clockify")
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.status_var = tk.StringVar(value="Starting...")
+        self.day_var = tk.StringVar(value="-")
+        self.events_var = tk.StringVar(value="0")
+        self.writes_var = tk.StringVar(value="0")
+        self.rate_var = tk.StringVar(value="0.0 requests/s")
+        self.message_var = tk.StringVar(value="")
+        rows = [("Status:", self.status_var), ("Day:", self.day_var), ("Events handled:", self.events_var),
+                ("Writes done:", self.writes_var), ("API requests:", self.rate_var)]
+        for row, (text, var) in enumerate(rows):
+            ttk.Label(self.root, text=text).grid(row=row, column=0, padx=5, pady=2, sticky="e")
+            ttk.Label(self.root, textvariable=var).grid(row=row, column=1, padx=5, pady=2, sticky="w")
+        self.bar = ttk.Progressbar(self.root, length=320, maximum=self.total_days)
+        self.bar.grid(row=len(rows), column=0, columnspan=2, padx=5, pady=5)
+        ttk.Label(self.root, textvariable=self.message_var, wraplength=320).grid(
+            row=len(rows) + 1, column=0, columnspan=2, padx=5, pady=2, sticky="w")
+        self.button = ttk.Button(self.root, text="Cancel", command=self.cancel)
+        self.button.grid(row=len(rows) + 2, column=0, columnspan=2, pady=10)
+
+    def run(self):
+        self.updates = PROGRESS.attach()
+        handler = _WindowLogHandler()
+        handler.setFormatter(ConsoleFormatter("%(message)s"))
+        log.addHandler(handler)
+        self.worker = threading.Thread(target=self._work, name="sync", daemon=True)
+        self.worker.start()
+        self.status_var.set("Running")
+        self.root.after(self.POLL_INTERVAL_MS, self._poll)
+        try:
+            self.root.mainloop()
+        finally:
+            log.removeHandler(handler)
+            PROGRESS.detach()
+
+    def _work(self):
+        status = "Finished"
+        try:
+            self.target()
+        except Cancelled:
+            status = "Cancelled"
+            log.warning("Run cancelled by the user.")
+        except Exception as e:
+            status = f"Failed: {e}"
+            log.exception("Run failed")
+        self.updates.put(("done", status))
+
+    def _poll(self):
+        now = time.monotonic()
+        try:
+            while True:
+                kind, value = self.updates.get_nowait()
+                if kind == "day":
+                    self.day_var.set(str(value))
+                    self.bar["value"] = (value - self.first_day).days + 1
+                elif kind == "event":
+                    self.events += 1
+                elif kind == "write":
+                    self.writes += 1
+                elif kind == "request":
+                    self.requests += 1
+                    self.request_times.append(now)
+                elif kind == "message":
+                    self.message_var.set(value)
+                elif kind == "done":
+                    self._finish(value)
+        except queue.Empty:
+            pass
+        while self.request_times and now - self.request_times[0] > self.RATE_WINDOW:
+            self.request_times.popleft()
+        window = min(self.RATE_WINDOW, max(now - self.started, 1e-3))
+        self.events_var.set(str(self.events))
+        self.writes_var.set(str(self.writes))
+        self.rate_var.set(f"{self.requests} total, {len(self.request_times) / window:.1f}/s")
+        if not self.done:
+            self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _finish(self, status):
+        self.done = True
+        elapsed = time.monotonic() - self.started
+        self.status_var.set(f"{status} after {elapsed:.0f}s")
+        self.button.configure(text="Close", command=self.root.destroy, state="normal")
+        if self.closing:
+            self.root.after_idle(self.root.destroy)  # After this poll has finished with the widgets
+
+    def cancel(self):
+        if not self.done:
+            PROGRESS.cancel()
+            self.status_var.set("Cancelling...")
+            self.button.configure(state="disabled")
+
+    def close(self):
+        if self.done:
+            self.root.destroy()
+            return
+        # Let the worker stop cleanly first; _finish then closes the window
+        self.closing = True
+        self.cancel()
+
+
+def run_with_progress(target, start, end):
+    """
+    Run target() on a worker thread while a window shows its progress for
+    the start..end (YYYY-MM-DD) range. Returns once the window is closed.
+    """
+    ProgressWindow(target, start, end).run() 
\ No newline at end of file
@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from metrics import METRICS
+from progress import PROGRESS
+
+
+class WritePipeline:
+    """
+    Runs independent Clockify writes with bounded concurrency. Every write is
+    recorded with its label so one failure does not abort the others.
+    """
+    def __init__(self, concurrency=1):
+        self.concurrency = max(1, concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency) if self.concurrency > 1 else None
+        self._futures = []
+        self._lock = threading.Lock()
+        self.succeeded = []
+        self.failed = []
+
+    def _run(self, label, fn, args, kwargs):
+        try:
+            with METRICS.phase("writes"):
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self.failed.append((label, e))
+            return None
+        finally:
+            PROGRESS.write()
+        with self._lock:
+            self.succeeded.append((label, result))
+        return result
+
+    def submit(self, label, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs). With a concurrency of 1 the write runs inline.
+        """
+        if self._executor is None:
+            self._run(label, fn, args, kwargs)
+            return
+        self._futures.append(self._executor.submit(self._run, label, fn, args, kwargs))
+
+    def wait(self):
+        """
+        Block until every queued write has finished.
+        """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def summary(self):
+        return f"{len(self.succeeded)} succeeded, {len(self.failed)} failed"